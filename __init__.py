@@ -12,8 +12,11 @@ from aiohttp import web
 from server import PromptServer
 
 from .sengine_node import NODE_CLASS_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS, clear_lora_cache, get_lora_cache_info
-from .civitai_api import get_civitai_api
-from .lora_cache import get_cache_manager
+from .civitai_api import get_civitai_api, LIST_FIELDS
+from .lora_cache import get_cache_manager, is_sha256
+from .lora_prefetch import get_prefetcher
+from .thumbnails import get_thumbnail_cache, url_version, CACHE_CONTROL as THUMB_CACHE_CONTROL, \
+    CACHE_CONTROL_UNVERSIONED as THUMB_CACHE_CONTROL_UNVERSIONED
 from .civitai_upload import CivitaiUploader, create_img2img_composite
 
 # Export node mappings
@@ -30,6 +33,39 @@ __version__ = "1.0.0"
 # Server Routes
 # ============================================================================
 
+# Thumbnails (and their blurhash placeholders) for new catalog entries are created in the background,
+# always on the server loop that also serves them
+get_civitai_api().add_catalog_listener(get_thumbnail_cache().warm, loop=PromptServer.instance.loop)
+get_civitai_api().set_blurhash_source(get_thumbnail_cache().get_blurhash)
+
+
+def _parse_fields(query):
+    """The fields query param as a tuple: list fields by default, None for "all"."""
+    fields = query.get("fields", "")
+    if not fields:
+        return LIST_FIELDS
+    if fields in ("all", "*"):
+        return None
+    return tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+
+
+def _catalog_headers(meta):
+    """Catalog age and refresh state as response headers, keeping them out of cached bodies."""
+    return {
+        "X-SEngine-Catalog-Age": "" if meta["age_seconds"] is None else str(meta["age_seconds"]),
+        "X-SEngine-Catalog-Stale": str(meta["stale"]).lower(),
+        "X-SEngine-Catalog-Refreshing": str(meta["refreshing"]).lower(),
+    }
+
+
+def _announce_catalog(loras):
+    """Tell the sidebar a background refresh produced a new catalog."""
+    try:
+        PromptServer.instance.send_sync("sengine_catalog", {"count": len(loras), "updated": time.time()})
+    except Exception as e:
+        print(f"[SEngine] Error announcing catalog refresh: {e}")
+
+
 @PromptServer.instance.routes.get("/sengine/loras")
 async def get_loras(request):
     """
@@ -38,19 +74,27 @@ async def get_loras(request):
     Query params:
         api_key: Optional Civitai API key
         refresh: Set to "true" to force refresh from API
+        full: Set to "true" to re-crawl the whole catalog instead of only new models
+        fields: Comma-separated entry fields, or "all" (default: the fields the list view needs)
     """
     try:
         api_key = request.rel_url.query.get("api_key", "")
-        force_refresh = request.rel_url.query.get("refresh", "").lower() == "true"
+        full_sync = request.rel_url.query.get("full", "").lower() == "true"
+        force_refresh = full_sync or request.rel_url.query.get("refresh", "").lower() == "true"
 
         api = get_civitai_api(api_key)
-        loras = await api.fetch_sworks_loras(force_refresh=force_refresh)
+        if force_refresh:
+            await api.fetch_sworks_loras(force_refresh=True, full_sync=full_sync)
+            # A failed refresh leaves the old catalog in place, report its real age
+            meta = api.get_catalog_meta()
+        else:
+            # Serve an expired catalog immediately, the sidebar is told when the refresh lands
+            _, meta = await api.get_loras(on_refreshed=_announce_catalog)
 
-        return web.json_response({
-            "success": True,
-            "loras": loras,
-            "count": len(loras)
-        })
+        # The body is built and compressed once per catalog generation; what changes
+        # between requests of the same generation goes in headers so the ETag holds
+        return await api.get_catalog_body(_parse_fields(request.rel_url.query)).respond(
+            request, headers=_catalog_headers(meta))
 
     except Exception as e:
         print(f"[SEngine] Error in get_loras: {e}")
@@ -61,6 +105,133 @@ async def get_loras(request):
         }, status=500)
 
 
+@PromptServer.instance.routes.get("/sengine/loras/query")
+async def query_loras(request):
+    """
+    Search the LoRA catalog and return one page of matches.
+
+    Like /sengine/loras the page is compressed and carries an ETag (304 on
+    If-None-Match), with the catalog age and refresh state in headers.
+
+    Query params:
+        api_key: Optional Civitai API key
+        q: Search words, each must match a name, trained word or tag by prefix (or fuzzily)
+        tag: Tag the LoRAs must have (repeat for several)
+        sort: relevance, newest, name or size
+        offset: Number of matches to skip (default 0)
+        limit: Page size (default 100)
+        fields: Comma-separated entry fields, or "all" (default: the fields the list view needs)
+        refresh: Set to "true" to refresh the catalog from the API first
+    """
+    try:
+        query = request.rel_url.query
+        try:
+            offset = int(query.get("offset", 0))
+            limit = int(query.get("limit", 100))
+        except ValueError:
+            return web.json_response({
+                "success": False,
+                "error": "offset and limit must be integers",
+                "loras": []
+            }, status=400)
+
+        api = get_civitai_api(query.get("api_key", ""))
+        if query.get("refresh", "").lower() == "true":
+            await api.fetch_sworks_loras(force_refresh=True)
+            meta = api.get_catalog_meta()
+        else:
+            # Makes sure a catalog exists and starts a background refresh if it expired
+            _, meta = await api.get_loras(on_refreshed=_announce_catalog)
+
+        body = api.get_query_body(
+            q=query.get("q", ""),
+            tags=query.getall("tag", []),
+            sort=query.get("sort"),
+            offset=offset,
+            limit=limit,
+            fields=_parse_fields(query)
+        )
+        return await body.respond(request, headers=_catalog_headers(meta))
+
+    except Exception as e:
+        print(f"[SEngine] Error in query_loras: {e}")
+        return web.json_response({
+            "success": False,
+            "error": str(e),
+            "loras": []
+        }, status=500)
+
+
+@PromptServer.instance.routes.get("/sengine/lora/{version_id}")
+async def get_lora_detail(request):
+    """
+    Get the complete catalog entry of a LoRA, including description, preview images and trained words.
+
+    Path params:
+        version_id: The Civitai model version ID
+    """
+    try:
+        version_id = int(request.match_info["version_id"])
+        lora = get_civitai_api().get_lora(version_id)
+        if lora is None:
+            return web.json_response({
+                "success": False,
+                "error": f"Version {version_id} is not in the catalog"
+            }, status=404)
+
+        return web.json_response({"success": True, "lora": lora})
+
+    except Exception as e:
+        print(f"[SEngine] Error in get_lora_detail: {e}")
+        return web.json_response({
+            "success": False,
+            "error": str(e)
+        }, status=500)
+
+
+@PromptServer.instance.routes.get("/sengine/thumb/{version_id}")
+async def get_thumbnail(request):
+    """
+    Get a LoRA's preview image as a small cached thumbnail.
+
+    Redirects to the original preview if it cannot be thumbnailed (e.g. a video).
+
+    Path params:
+        version_id: The Civitai model version ID
+
+    Query params:
+        v: url_version of the preview URL; when it is current the thumbnail is cached for a week
+    """
+    try:
+        version_id = int(request.match_info["version_id"])
+        preview_url = (get_civitai_api().get_lora(version_id) or {}).get("preview_url")
+        if not preview_url:
+            return web.json_response({
+                "success": False,
+                "error": f"No preview for version {version_id}"
+            }, status=404)
+
+        thumbs = get_thumbnail_cache()
+        path = await thumbs.ensure(version_id, preview_url)
+        if path is None:
+            raise web.HTTPFound(preview_url)
+
+        versioned = request.rel_url.query.get("v") == url_version(preview_url)
+        return web.FileResponse(path, headers={
+            "Cache-Control": THUMB_CACHE_CONTROL if versioned else THUMB_CACHE_CONTROL_UNVERSIONED,
+            "Content-Type": thumbs.content_type,
+        })
+
+    except web.HTTPException:
+        raise
+    except Exception as e:
+        print(f"[SEngine] Error in get_thumbnail: {e}")
+        return web.json_response({
+            "success": False,
+            "error": str(e)
+        }, status=500)
+
+
 @PromptServer.instance.routes.get("/sengine/lora/{version_id}/status")
 async def get_lora_status(request):
     """
@@ -75,7 +246,8 @@ async def get_lora_status(request):
 
         is_downloaded = cache_manager.is_downloaded(version_id)
         progress = cache_manager.get_download_progress(version_id)
-        local_path = cache_manager.get_local_path(version_id) if is_downloaded else None
+        local_path = cache_manager.get_local_path(version_id, touch=False) if is_downloaded else None
+        queue = cache_manager.get_queue_status(version_id) or {}
 
         return web.json_response({
             "success": True,
@@ -83,7 +255,12 @@ async def get_lora_status(request):
             "is_downloaded": is_downloaded,
             "downloading": progress >= 0,
             "progress": progress if progress >= 0 else None,
-            "local_path": local_path
+            "local_path": local_path,
+            "pinned": cache_manager.is_pinned(version_id),
+            "queued": queue.get("state") == "queued",
+            "priority": queue.get("priority"),
+            "queue_position": queue.get("queue_position"),
+            "queue_depth": queue.get("queue_depth", 0)
         })
 
     except Exception as e:
@@ -105,6 +282,7 @@ async def download_lora(request):
     Body (JSON):
         api_key: Civitai API key
         file_name: Original filename
+        sha256: Expected SHA256 of the file (optional)
     """
     try:
         version_id = int(request.match_info["version_id"])
@@ -113,6 +291,12 @@ async def download_lora(request):
         body = await request.json()
         api_key = body.get("api_key", "")
         file_name = body.get("file_name", f"{version_id}.safetensors")
+        expected_sha256 = body.get("sha256", "")
+        if expected_sha256 and not is_sha256(expected_sha256):
+            return web.json_response({
+                "success": False,
+                "error": "sha256 must be 64 hex characters"
+            }, status=400)
 
         cache_manager = get_cache_manager()
 
@@ -121,12 +305,12 @@ async def download_lora(request):
             return web.json_response({
                 "success": True,
                 "already_downloaded": True,
-                "local_path": cache_manager.get_local_path(version_id)
+                "local_path": cache_manager.get_local_path(version_id, touch=False)
             })
 
         # Download the LoRA
         success, result = await cache_manager.download_lora(
-            version_id, file_name, api_key
+            version_id, file_name, api_key, expected_sha256=expected_sha256
         )
 
         if success:
@@ -148,6 +332,71 @@ async def download_lora(request):
         }, status=500)
 
 
+@PromptServer.instance.routes.post("/sengine/lora/{version_id}/pin")
+async def pin_lora(request):
+    """
+    Pin or unpin a downloaded LoRA so disk-budget eviction never deletes it.
+
+    Path params:
+        version_id: The Civitai model version ID
+
+    Body (JSON):
+        pinned: true to pin (default), false to unpin
+    """
+    try:
+        version_id = int(request.match_info["version_id"])
+        body = await request.json() if request.can_read_body else {}
+        pinned = bool(body.get("pinned", True))
+
+        if not get_cache_manager().set_pinned(version_id, pinned):
+            return web.json_response({
+                "success": False,
+                "error": "LoRA is not downloaded"
+            }, status=404)
+
+        return web.json_response({
+            "success": True,
+            "version_id": version_id,
+            "pinned": pinned
+        })
+
+    except Exception as e:
+        print(f"[SEngine] Error in pin_lora: {e}")
+        return web.json_response({
+            "success": False,
+            "error": str(e)
+        }, status=500)
+
+
+@PromptServer.instance.routes.post("/sengine/prefetch")
+async def prefetch_loras(request):
+    """
+    Send prefetch hints and start downloading likely-needed LoRAs in the background.
+
+    Body (JSON):
+        api_key: Civitai API key
+        selection: LoRA entries currently selected on the node
+        saved: LoRA entries of all saved configurations
+    """
+    try:
+        body = await request.json()
+        prefetcher = get_prefetcher()
+        prefetcher.set_hints(body.get("selection") or [], body.get("saved") or [])
+        prefetcher.start(body.get("api_key", ""))
+
+        return web.json_response({
+            "success": True,
+            "pending": prefetcher.pending
+        })
+
+    except Exception as e:
+        print(f"[SEngine] Error in prefetch_loras: {e}")
+        return web.json_response({
+            "success": False,
+            "error": str(e)
+        }, status=500)
+
+
 @PromptServer.instance.routes.get("/sengine/cache/info")
 async def get_cache_info(request):
     """Get information about the LoRA cache."""
@@ -158,7 +407,9 @@ async def get_cache_info(request):
             "success": True,
             "cached_count": cache_manager.get_cached_count(),
             "cache_size_bytes": cache_manager.get_cache_size(),
-            "cache_size_mb": round(cache_manager.get_cache_size() / (1024 * 1024), 2)
+            "cache_size_mb": round(cache_manager.get_cache_size() / (1024 * 1024), 2),
+            "disk_headroom_bytes": cache_manager.get_disk_headroom(),
+            "prefetch": get_prefetcher().info()
         })
 
     except Exception as e:
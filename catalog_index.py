@@ -0,0 +1,154 @@
+"""
+In-memory search index over the LoRA catalog.
+"""
+import re
+import bisect
+import difflib
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# How much a word counts depending on where it appears
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "trained_words": 2.0,
+    "tags": 1.0,
+}
+
+# Query terms this long that match no word as a prefix are matched fuzzily instead
+MIN_FUZZY_LENGTH = 4
+FUZZY_CUTOFF = 0.8  # difflib similarity a fuzzy match needs
+FUZZY_MATCHES = 3   # Closest words tried per fuzzy term
+
+SORT_ORDERS = ("relevance", "newest", "name", "size")
+MAX_QUERY_LIMIT = 1000
+
+
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall((text or "").lower())
+
+
+class CatalogIndex:
+    """
+    Inverted index over one catalog generation.
+
+    Words from names, trained words and tags map to the entries containing
+    them, kept in a sorted vocabulary so a query term matches every word it
+    is a prefix of. Terms that match nothing that way fall back to the
+    closest words by edit similarity. Tag counts over the whole catalog are
+    computed once; counts for a filtered result are computed per query.
+    """
+
+    def __init__(self, loras: List[Dict], generation: int = 0):
+        self.loras = loras
+        self.generation = generation
+        self.by_version: Dict[int, Dict] = {lora.get("version_id"): lora for lora in loras}
+
+        postings: Dict[str, Dict[int, float]] = {}
+        self._tag_entries: Dict[str, set] = {}
+        tag_counts = Counter()
+        for position, lora in enumerate(loras):
+            fields = {
+                "name": [lora.get("name", "")],
+                "trained_words": lora.get("trained_words") or [],
+                "tags": lora.get("tags") or [],
+            }
+            for field, texts in fields.items():
+                for text in texts:
+                    for word in _words(text):
+                        entries = postings.setdefault(word, {})
+                        entries[position] = max(entries.get(position, 0.0), FIELD_WEIGHTS[field])
+            for tag in set(fields["tags"]):
+                self._tag_entries.setdefault(tag, set()).add(position)
+                tag_counts[tag] += 1
+
+        self._postings = postings
+        self._vocab = sorted(postings)
+        self.tag_counts = self._facets(tag_counts)
+
+    @staticmethod
+    def _facets(counts: Counter) -> List[Dict]:
+        """Tag counts, most common first."""
+        return [{"tag": tag, "count": count}
+                for tag, count in sorted(counts.items(), key=lambda item: (-item[1], item[0]))]
+
+    def _match_term(self, term: str) -> Dict[int, float]:
+        """Entries matching one query term, with a score each."""
+        matches: Dict[int, float] = {}
+
+        def add(word, factor):
+            for position, weight in self._postings[word].items():
+                matches[position] = max(matches.get(position, 0.0), weight * factor)
+
+        start = bisect.bisect_left(self._vocab, term)
+        for word in self._vocab[start:]:
+            if not word.startswith(term):
+                break
+            # Whole-word matches rank above prefix matches
+            add(word, 1.0 if word == term else 0.8)
+
+        if not matches and len(term) >= MIN_FUZZY_LENGTH:
+            for word in difflib.get_close_matches(term, self._vocab, n=FUZZY_MATCHES, cutoff=FUZZY_CUTOFF):
+                add(word, 0.5)
+        return matches
+
+    def query(self, q: str = "", tags: Sequence[str] = (), sort: Optional[str] = None,
+              offset: int = 0, limit: int = 100, fields: Optional[Sequence[str]] = None) -> Dict:
+        """
+        Search the catalog.
+
+        Args:
+            q: Words that must all match (by prefix, or fuzzily) a name, trained word or tag
+            tags: Tags an entry must all have
+            sort: One of SORT_ORDERS; relevance when searching, otherwise newest
+            offset: Number of matches to skip
+            limit: Maximum number of matches to return
+            fields: Entry fields to return, None for complete entries
+
+        Returns:
+            Dict with total, count (catalog size), offset, limit, sort, loras
+            (the requested page) and tags (tag counts over all matches)
+        """
+        matched: Optional[set] = None
+        for tag in tags:
+            entries = self._tag_entries.get(tag, set())
+            matched = set(entries) if matched is None else matched & entries
+
+        scores: Dict[int, float] = {}
+        for term in _words(q):
+            term_matches = self._match_term(term)
+            matched = set(term_matches) if matched is None else matched & set(term_matches)
+            for position in matched:
+                scores[position] = scores.get(position, 0.0) + term_matches[position]
+
+        filtered = matched is not None
+        positions = sorted(matched) if filtered else list(range(len(self.loras)))
+
+        if sort not in SORT_ORDERS:
+            sort = "relevance" if scores else "newest"
+        # The catalog is stored newest first, so position order is "newest"
+        if sort == "relevance":
+            positions.sort(key=lambda p: -scores.get(p, 0.0))
+        elif sort == "name":
+            positions.sort(key=lambda p: (self.loras[p].get("name") or "").lower())
+        elif sort == "size":
+            positions.sort(key=lambda p: -(self.loras[p].get("file_size_kb") or 0))
+
+        offset = max(offset, 0)
+        limit = min(max(limit, 0), MAX_QUERY_LIMIT)
+        if filtered:
+            facets = self._facets(Counter(tag for p in positions for tag in set(self.loras[p].get("tags") or [])))
+        else:
+            facets = self.tag_counts
+
+        return {
+            "total": len(positions),
+            "count": len(self.loras),
+            "offset": offset,
+            "limit": limit,
+            "sort": sort,
+            "loras": [self.loras[p] if fields is None else {f: self.loras[p][f] for f in fields if f in self.loras[p]}
+                      for p in positions[offset:offset + limit]],
+            "tags": facets,
+        }
@@ -6,10 +6,34 @@ import json
 import time
 import aiohttp
 import asyncio
-from typing import Optional, Dict, List, Any
+import threading
+from typing import Optional, Dict, List, Any, Callable, Tuple
+
+from .cache_io import atomic_write_json
+from .catalog_index import CatalogIndex
+from .http_cache import EncodedBody
 
 # Cache settings
 CACHE_DURATION = 3600  # 1 hour in seconds
+# Full re-crawl of the catalog (catches deleted and edited models), refreshes in between
+# only fetch what is newer than the cached catalog (override with SENGINE_CATALOG_FULL_SYNC_HOURS)
+FULL_SYNC_INTERVAL = float(os.environ.get("SENGINE_CATALOG_FULL_SYNC_HOURS", "24")) * 3600
+MAX_CATALOG_MODELS = 500  # Safety limit on models fetched per sync, the newest ones make the catalog
+
+# Fields of a catalog entry in list responses, the rest (description, preview images,
+# trained words) is fetched per LoRA from /sengine/lora/{version_id}
+LIST_FIELDS = ("id", "version_id", "name", "base_model", "preview_url", "blurhash", "tags",
+               "file_name", "file_size_kb", "download_url", "sha256")
+MAX_CACHED_PROJECTIONS = 8  # Distinct field selections whose bodies are kept per generation
+MAX_CACHED_QUERIES = 32  # Query pages whose bodies (and compressed variants) are kept
+
+
+def select_fields(loras: List[Dict], fields: Optional[Tuple[str, ...]] = LIST_FIELDS) -> List[Dict]:
+    """Entries reduced to fields (all fields if None)."""
+    if fields is None:
+        return loras
+    return [{field: lora[field] for field in fields if field in lora} for lora in loras]
+
 
 class CivitaiAPI:
     """Client for interacting with Civitai API."""
@@ -24,6 +48,20 @@ class CivitaiAPI:
         self.cache_dir = cache_dir
         self.cache_file = os.path.join(cache_dir, "api_cache.json")
         os.makedirs(cache_dir, exist_ok=True)
+        self._sync_task: Optional[asyncio.Future] = None
+        self._sync_full = False  # Whether _sync_task ends with a full sync
+
+        # Parsed api_cache.json, re-read only when its mtime changes (e.g. another process synced)
+        self._catalog_lock = threading.Lock()
+        self._catalog: Optional[Dict] = None
+        self._catalog_mtime: Optional[int] = None
+        self._catalog_body: Optional[Tuple[int, Dict[tuple, EncodedBody]]] = None
+        self._query_bodies: Dict[tuple, EncodedBody] = {}
+        self._index = CatalogIndex([])
+        self._catalog_listeners: List[Tuple[Callable[[List[Dict]], None], Optional[asyncio.AbstractEventLoop]]] = []
+        self.generation = 0  # Bumped whenever the in-memory catalog is replaced
+        # Preview placeholders are merged into list entries, never stored in api_cache.json
+        self._blurhash_source: Optional[Callable[[int, str], Optional[str]]] = None
 
     def set_api_key(self, api_key: str):
         """Update the API key."""
@@ -38,29 +76,157 @@ class CivitaiAPI:
             headers["Authorization"] = f"Bearer {self.api_key}"
         return headers
 
-    def _load_cache(self) -> Optional[Dict]:
-        """Load cached API response if valid."""
+    def _read_cache_file(self) -> Optional[Dict]:
+        """
+        Cached catalog ({timestamp, full_sync, data}) regardless of age.
+
+        Served from memory; the file is only parsed again when its mtime changed.
+        """
         try:
-            if os.path.exists(self.cache_file):
+            mtime = os.stat(self.cache_file).st_mtime_ns
+        except OSError:
+            return self._catalog
+        if mtime != self._catalog_mtime:
+            try:
                 with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
+                    self._set_catalog(json.load(f), mtime)
+            except Exception as e:
+                print(f"[SEngine] Error loading cache: {e}")
+        return self._catalog
+
+    def _set_catalog(self, cache_data: Dict, mtime: Optional[int]):
+        """Replace the in-memory catalog, start a new generation and index it."""
+        index = CatalogIndex(cache_data.get('data') or [], self.generation + 1)
+        with self._catalog_lock:
+            self._catalog = cache_data
+            self._catalog_mtime = mtime
+            self._catalog_body = None
+            self._query_bodies = {}
+            self._index = index
+            self.generation = index.generation
+
+        for listener, loop in self._catalog_listeners:
+            try:
+                if loop is None:
+                    listener(index.loras)
+                else:
+                    # The file may be re-read on any thread (e.g. the download loop looking up a hash)
+                    loop.call_soon_threadsafe(listener, index.loras)
+            except Exception as e:
+                print(f"[SEngine] Error in catalog listener: {e}")
+
+    def set_blurhash_source(self, source: Callable[[int, str], Optional[str]]):
+        """Register source(version_id, preview_url), the blurhash of a preview or None."""
+        self._blurhash_source = source
+
+    def _with_blurhashes(self, loras: List[Dict]) -> List[Dict]:
+        """Entries with the blurhash of their current preview added where one is known."""
+        source = self._blurhash_source
+        if source is None:
+            return loras
+        merged = []
+        for lora in loras:
+            hash_str = source(lora.get('version_id'), lora['preview_url']) if lora.get('preview_url') else None
+            merged.append(dict(lora, blurhash=hash_str) if hash_str else lora)
+        return merged
+
+    def add_catalog_listener(self, callback: Callable[[List[Dict]], None],
+                             loop: Optional[asyncio.AbstractEventLoop] = None):
+        """
+        Register callback(loras), called whenever a new catalog generation is loaded.
 
-                # Check if cache is still valid
-                if time.time() - cache_data.get('timestamp', 0) < CACHE_DURATION:
-                    return cache_data.get('data')
-        except Exception as e:
-            print(f"[SEngine] Error loading cache: {e}")
+        Args:
+            callback: Called with the new catalog entries
+            loop: Event loop to call it on, from whichever thread loaded the catalog;
+                None calls it directly on that thread
+        """
+        self._catalog_listeners.append((callback, loop))
+
+    def get_index(self) -> CatalogIndex:
+        """Search index of the current catalog."""
+        self._read_cache_file()
+        return self._index
+
+    def query(self, fields: Optional[Tuple[str, ...]] = LIST_FIELDS, **kwargs) -> Dict:
+        """Search the catalog (arguments as CatalogIndex.query), with blurhashes merged into the page."""
+        result = self.get_index().query(fields=None, **kwargs)
+        result["loras"] = select_fields(self._with_blurhashes(result["loras"]), fields)
+        return result
+
+    def get_catalog_body(self, fields: Optional[Tuple[str, ...]] = LIST_FIELDS) -> EncodedBody:
+        """
+        The /sengine/loras response body for the cached catalog.
+
+        Serialized (and later compressed) once per generation and field
+        selection; it only holds what stays the same for the whole
+        generation, so its ETag does too. Blurhashes known when the body
+        is built are included, later ones appear with the next generation.
+
+        Args:
+            fields: Entry fields to include, None for complete entries
+        """
+        cache_data = self._read_cache_file() or {}
+        key = fields if fields is not None else ("*",)
+        with self._catalog_lock:
+            if self._catalog_body is None or self._catalog_body[0] != self.generation:
+                self._catalog_body = (self.generation, {})
+            bodies = self._catalog_body[1]
+            if key not in bodies:
+                if len(bodies) >= MAX_CACHED_PROJECTIONS:
+                    bodies.pop(next(iter(bodies)))
+                loras = cache_data.get('data') or []
+                bodies[key] = EncodedBody(json.dumps({
+                    "success": True,
+                    "count": len(loras),
+                    "updated_at": cache_data.get('timestamp', 0),
+                    "loras": select_fields(self._with_blurhashes(loras), fields),
+                }).encode('utf-8'))
+            return bodies[key]
+
+    def get_query_body(self, fields: Optional[Tuple[str, ...]] = LIST_FIELDS, **kwargs) -> EncodedBody:
+        """
+        The /sengine/loras/query response body for one page (arguments as query).
+
+        The page is built on every request, since blurhashes can arrive within
+        a generation, but while it is unchanged the body cached for this
+        generation and query is reused with the variants it already compressed.
+        """
+        generation = self.get_index().generation
+        body = EncodedBody(json.dumps({"success": True, **self.query(fields=fields, **kwargs)}).encode('utf-8'))
+        key = (generation, fields, json.dumps(kwargs, sort_keys=True))
+        with self._catalog_lock:
+            cached = self._query_bodies.get(key)
+            if cached is not None and cached.digest == body.digest:
+                return cached
+            self._query_bodies.pop(key, None)
+            if len(self._query_bodies) >= MAX_CACHED_QUERIES:
+                self._query_bodies.pop(next(iter(self._query_bodies)))
+            self._query_bodies[key] = body
+        return body
+
+    def get_lora(self, version_id: int) -> Optional[Dict]:
+        """Complete catalog entry of a version (even if the catalog expired), or None."""
+        return self.get_index().by_version.get(version_id)
+
+    def _load_cache(self) -> Optional[Dict]:
+        """Load cached API response if valid."""
+        cache_data = self._read_cache_file()
+        # Check if cache is still valid
+        if cache_data and time.time() - cache_data.get('timestamp', 0) < CACHE_DURATION:
+            return cache_data.get('data')
         return None
 
-    def _save_cache(self, data: Any):
+    def _save_cache(self, data: Any, full_sync: float = 0):
         """Save API response to cache."""
         try:
             cache_data = {
                 'timestamp': time.time(),
+                'full_sync': full_sync,
                 'data': data
             }
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, indent=2)
+            # Other ComfyUI processes may be reading the same file
+            atomic_write_json(self.cache_file, cache_data)
+            self._set_catalog(cache_data, os.stat(self.cache_file).st_mtime_ns)
         except Exception as e:
             print(f"[SEngine] Error saving cache: {e}")
 
@@ -119,6 +285,7 @@ class CivitaiAPI:
                 'download_url': version.get('downloadUrl', ''),
                 'file_name': lora_file.get('name', '') if lora_file else '',
                 'file_size_kb': lora_file.get('sizeKB', 0) if lora_file else 0,
+                'sha256': (lora_file.get('hashes') or {}).get('SHA256', '') if lora_file else '',
                 'trained_words': version.get('trainedWords', []),
                 'tags': tags,
             }
@@ -126,12 +293,13 @@ class CivitaiAPI:
 
         return loras
 
-    async def fetch_sworks_loras(self, force_refresh: bool = False) -> List[Dict]:
+    async def fetch_sworks_loras(self, force_refresh: bool = False, full_sync: bool = False) -> List[Dict]:
         """
         Fetch all LoRAs from SWORKS_TEAM that are compatible with klein-9b.
 
         Args:
             force_refresh: If True, bypass cache and fetch fresh data
+            full_sync: If True, re-crawl the whole catalog instead of only what is new
 
         Returns:
             List of LoRA information dictionaries
@@ -142,66 +310,174 @@ class CivitaiAPI:
             if cached is not None:
                 return cached
 
-        # Fetch from API
-        url = f"{self.BASE_URL}/models"
-        params = {
-            "username": "SWORKS_TEAM",
-            "types": "LORA",
-            "limit": 100,
-            "sort": "Newest",
+        return await asyncio.shield(self._start_sync(full_sync))
+
+    def _start_sync(self, full_sync: bool = False) -> asyncio.Future:
+        """
+        Start a catalog sync on the running loop, or return the one already running.
+
+        A full sync asked for while an incremental one runs is queued after it.
+        """
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.ensure_future(self._sync_catalog(full_sync))
+            self._sync_full = full_sync
+        elif full_sync and not self._sync_full:
+            self._sync_task = asyncio.ensure_future(self._sync_after(self._sync_task))
+            self._sync_full = True
+        return self._sync_task
+
+    async def _sync_after(self, running: asyncio.Future) -> List[Dict]:
+        """Full sync once the running sync has finished (however it ends)."""
+        await asyncio.wait({running})
+        return await self._sync_catalog(full_sync=True)
+
+    async def get_loras(self, on_refreshed: Optional[Callable[[List[Dict]], None]] = None) -> Tuple[List[Dict], Dict]:
+        """
+        Read the catalog stale-while-revalidate.
+
+        An expired catalog is returned right away while a single background
+        sync replaces it; on_refreshed(loras) is called once that sync has
+        stored fresh data. Only when nothing is cached does this wait.
+
+        Returns:
+            Tuple of (loras, meta) with meta holding age_seconds, stale and refreshing
+        """
+        cache_data = self._read_cache_file()
+        if not cache_data or not cache_data.get('data'):
+            loras = await self.fetch_sworks_loras(force_refresh=True)
+            return loras, self.get_catalog_meta()
+
+        meta = self.get_catalog_meta()
+        if meta["stale"]:
+            running = self._sync_task is not None and not self._sync_task.done()
+            task = self._start_sync()
+            if on_refreshed is not None and not running:
+                def done(task):
+                    # A failed sync keeps the old catalog, nothing new to announce
+                    if not task.cancelled() and task.exception() is None and self._load_cache() is not None:
+                        on_refreshed(task.result())
+                task.add_done_callback(done)
+            meta["refreshing"] = True
+        return cache_data['data'], meta
+
+    def get_catalog_meta(self) -> Dict:
+        """
+        State of the cached catalog: age_seconds (None if there is none),
+        stale, and whether a sync is refreshing it.
+        """
+        timestamp = (self._read_cache_file() or {}).get('timestamp')
+        age = max(time.time() - timestamp, 0) if timestamp else None
+        return {
+            "age_seconds": int(age) if age is not None else None,
+            "stale": age is None or age >= CACHE_DURATION,
+            "refreshing": self._sync_task is not None and not self._sync_task.done(),
         }
 
-        all_models = []
+    async def _sync_catalog(self, full_sync: bool = False) -> List[Dict]:
+        """Fetch the catalog from Civitai (incrementally when possible) and cache it."""
+        cache_data = self._read_cache_file() or {}
+        previous = cache_data.get('data') or []
+        last_full_sync = cache_data.get('full_sync', 0)
 
-        try:
-            async with aiohttp.ClientSession() as session:
-                # Handle pagination
-                while url:
-                    async with session.get(
-                        url,
-                        params=params if not all_models else None,  # Only use params on first request
-                        headers=self._get_headers()
-                    ) as response:
-                        if response.status != 200:
-                            error_text = await response.text()
-                            print(f"[SEngine] API error {response.status}: {error_text}")
-                            break
-
-                        data = await response.json()
-                        items = data.get('items', [])
-                        all_models.extend(items)
-
-                        # Check for next page
-                        metadata = data.get('metadata', {})
-                        url = metadata.get('nextPage')
-                        params = None  # Clear params for subsequent requests
-
-                        # Safety limit
-                        if len(all_models) > 500:
-                            break
+        # Newest-first listing: only models added or updated since the last sync need fetching
+        incremental = not full_sync and bool(previous) and time.time() - last_full_sync < FULL_SYNC_INTERVAL
+        known = {(lora.get('id'), lora.get('version_id')) for lora in previous} if incremental else None
 
+        try:
+            models, reached_known, complete = await self._fetch_models(known)
         except Exception as e:
             print(f"[SEngine] Error fetching from Civitai: {e}")
             # Return cached data if available, even if expired
-            if os.path.exists(self.cache_file):
-                try:
-                    with open(self.cache_file, 'r', encoding='utf-8') as f:
-                        return json.load(f).get('data', [])
-                except:
-                    pass
-            return []
+            return previous
 
         # Filter for klein-9b compatible LoRAs
-        klein_models = self._filter_klein_loras(all_models)
+        klein_models = self._filter_klein_loras(models)
 
         # Extract relevant info
         loras = self._extract_lora_info(klein_models)
 
+        if reached_known or not complete:
+            # Merge: fetched models replace their older entries, the rest stay in order
+            fetched_ids = {lora['id'] for lora in loras}
+            loras += [lora for lora in previous if lora.get('id') not in fetched_ids]
+            if reached_known:
+                print(f"[SEngine] Incremental catalog sync: {len(fetched_ids)} new or updated model(s)")
+            else:
+                # Models between the last page fetched and the cached ones may be missing
+                last_full_sync = 0
+                print(f"[SEngine] Catalog sync stopped early, merged {len(fetched_ids)} model(s); next sync re-crawls")
+        else:
+            last_full_sync = time.time()
+            print(f"[SEngine] Full catalog sync: {len(loras)} LoRA(s)")
+
         # Cache the results
-        self._save_cache(loras)
+        self._save_cache(loras, last_full_sync)
 
         return loras
 
+    async def _fetch_models(self, known: Optional[set] = None) -> tuple:
+        """
+        Page through SWORKS_TEAM's models, newest first.
+
+        Args:
+            known: (model id, latest version id) pairs already in the catalog;
+                paging stops at the first model that matches one
+
+        Returns:
+            Tuple of (models fetched before the stop point, whether a known model was
+            reached, whether paging got to a known model, the last page or
+            MAX_CATALOG_MODELS)
+        """
+        url = f"{self.BASE_URL}/models"
+        params = {
+            "username": "SWORKS_TEAM",
+            "types": "LORA",
+            "limit": 100,
+            "sort": "Newest",
+        }
+
+        all_models = []
+
+        async with aiohttp.ClientSession() as session:
+            # Handle pagination
+            while url:
+                async with session.get(
+                    url,
+                    params=params,  # Only set on the first request, nextPage carries them
+                    headers=self._get_headers()
+                ) as response:
+                    if response.status != 200:
+                        error_text = await response.text()
+                        print(f"[SEngine] API error {response.status}: {error_text}")
+                        if not all_models:
+                            raise IOError(f"Civitai API returned {response.status}")
+                        return all_models, False, False
+
+                    data = await response.json()
+                    for model in data.get('items', []):
+                        versions = model.get('modelVersions') or [{}]
+                        if known and (model.get('id'), versions[0].get('id')) in known:
+                            return all_models, True, True
+                        all_models.append(model)
+
+                    # Check for next page
+                    metadata = data.get('metadata', {})
+                    url = metadata.get('nextPage')
+                    params = None  # Clear params for subsequent requests
+
+                    # Safety limit: the newest models count as the whole catalog, so
+                    # a large account still gets incremental syncs afterwards
+                    if len(all_models) > MAX_CATALOG_MODELS and url:
+                        print(f"[SEngine] Catalog sync stopped at the {MAX_CATALOG_MODELS} model limit")
+                        return all_models, False, True
+
+        return all_models, False, True
+
+    def get_cached_file_hash(self, version_id: int) -> str:
+        """SHA256 of a version's file from the cached catalog (even if expired), or ''."""
+        lora = self.get_lora(int(version_id))
+        return (lora or {}).get('sha256', '') or ''
+
     def get_download_url(self, version_id: int) -> str:
         """Get the download URL for a specific model version."""
         return f"{self.DOWNLOAD_URL}/{version_id}"
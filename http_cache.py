@@ -0,0 +1,112 @@
+"""
+Conditional, precompressed HTTP responses for bodies that change rarely.
+"""
+import gzip
+import asyncio
+import hashlib
+import threading
+from typing import Dict, Optional
+
+from aiohttp import web
+
+try:
+    import brotli
+except ImportError:  # Optional, gzip is used without it
+    brotli = None
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9  # 11 compresses slightly better but takes seconds on a large catalog
+
+
+def pick_encoding(accept_encoding: str) -> str:
+    """Best content coding the client accepts: br, gzip or identity."""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return "identity"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check using weak comparison, so every coding of the same body matches."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    base = etag.strip('"').split("-")[0]
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag.strip('"').split("-")[0] == base:
+            return True
+    return False
+
+
+class EncodedBody:
+    """
+    One response body with a strong ETag and its compressed variants.
+
+    The ETag is a hash of the uncompressed body with the coding appended,
+    and each coding is compressed once, on first request.
+    """
+
+    def __init__(self, body: bytes, content_type: str = "application/json"):
+        self.content_type = content_type
+        self.digest = hashlib.sha256(body).hexdigest()[:20]
+        self._variants: Dict[str, bytes] = {"identity": body}
+        self._lock = threading.Lock()
+
+    def etag(self, encoding: str = "identity") -> str:
+        return f'"{self.digest}"' if encoding == "identity" else f'"{self.digest}-{encoding}"'
+
+    def variant(self, encoding: str) -> bytes:
+        """The body compressed with encoding (compressed on first use)."""
+        with self._lock:
+            if encoding not in self._variants:
+                body = self._variants["identity"]
+                if encoding == "br":
+                    self._variants[encoding] = brotli.compress(body, quality=BROTLI_QUALITY)
+                elif encoding == "gzip":
+                    self._variants[encoding] = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+                else:
+                    raise ValueError(f"Unsupported encoding: {encoding}")
+            return self._variants[encoding]
+
+    def is_compressed(self, encoding: str) -> bool:
+        return encoding in self._variants
+
+    async def respond(self, request: web.Request, cache_control: str = "no-cache",
+                      headers: Optional[Dict[str, str]] = None) -> web.Response:
+        """
+        Answer request with this body, or 304 when the client's copy is current.
+
+        cache_control defaults to no-cache: clients keep the body but revalidate it each time.
+        """
+        encoding = pick_encoding(request.headers.get("Accept-Encoding", ""))
+        headers = {
+            **(headers or {}),
+            "ETag": self.etag(encoding),
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if etag_matches(request.headers.get("If-None-Match"), self.etag()):
+            return web.Response(status=304, headers=headers)
+
+        if not self.is_compressed(encoding):
+            # Compressing a large body would stall the event loop
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.variant, encoding)
+        body = self.variant(encoding)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        response = web.Response(body=body, headers=headers, content_type=self.content_type)
+        # Already compressed, aiohttp must not compress it again
+        response.enable_compression = lambda *args, **kwargs: None
+        return response
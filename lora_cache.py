@@ -2,13 +2,270 @@
 LoRA file download and cache management.
 """
 import os
-import json
-import urllib.request
-import ssl
-from typing import Optional, Dict, Tuple
+import re
+import asyncio
+import hashlib
+import itertools
+import shutil
+import socket
+import threading
+import time
+import uuid
+from typing import Optional, Dict, List, Tuple
+from urllib.parse import urlsplit
 
+import aiohttp
 import folder_paths
 from .civitai_api import get_civitai_api
+from .lora_manifest import ManifestStore
+
+# Suffix of in-progress downloads in the loras folder
+PARTIAL_SUFFIX = ".part"
+
+# Persist resume offsets to the manifest every this many bytes
+CHECKPOINT_BYTES = 16 * 1024 * 1024
+
+# Parallel byte-range connections per file, 1 disables segmenting (override with SENGINE_DOWNLOAD_SEGMENTS)
+DOWNLOAD_SEGMENTS = max(1, int(os.environ.get("SENGINE_DOWNLOAD_SEGMENTS", "1")))
+
+# Smallest byte range worth its own connection (override with SENGINE_MIN_SEGMENT_MB)
+MIN_SEGMENT_SIZE = int(float(os.environ.get("SENGINE_MIN_SEGMENT_MB", "32")) * 1024 * 1024)
+
+# Reusable per-stream buffer that network chunks are coalesced into before each file write
+BUFFER_SIZE = 1024 * 1024
+
+# Pooled connections shared by all downloads (override with SENGINE_DOWNLOAD_CONNECTIONS)
+DOWNLOAD_CONNECTIONS = max(1, int(os.environ.get("SENGINE_DOWNLOAD_CONNECTIONS", "16")))
+
+# Keep downloaded files in a content-addressed store keyed by SHA256, with the
+# names in models/loras linked to it (enable with SENGINE_CONTENT_STORE=1)
+CONTENT_STORE = os.environ.get("SENGINE_CONTENT_STORE", "0") == "1"
+
+# Store directory inside the loras folder, so hardlinks stay on one filesystem.
+# Objects have no extension, so ComfyUI does not list them as LoRAs.
+CONTENT_STORE_DIR = ".sengine-objects"
+
+# Disk quota for downloaded LoRAs, least recently used ones are deleted past it
+# (override with SENGINE_LORA_DISK_MB, 0 = unlimited)
+DISK_BUDGET = int(float(os.environ.get("SENGINE_LORA_DISK_MB", "0")) * 1024 * 1024)
+
+# Files used this recently are never evicted, so a stack being run stays on disk
+EVICTION_GRACE_SECONDS = 300
+
+# Minimum interval between manifest writes caused only by last-access updates
+ACCESS_SAVE_INTERVAL = 60
+
+# How often cache stats trigger a background check of the manifest against the disk
+RECONCILE_INTERVAL = 600
+
+# A download claim without a heartbeat for this long is considered abandoned by its process
+CLAIM_TTL = 60
+
+# How often a process waiting on another one's download checks on it
+CLAIM_POLL_INTERVAL = 1.0
+
+# Download priority classes, lower runs first
+PRIORITY_BLOCKING = 0   # A running prompt is waiting for the file
+PRIORITY_USER = 1       # Requested from the sidebar
+PRIORITY_PREFETCH = 2   # Speculative background download
+PRIORITY_NAMES = {PRIORITY_BLOCKING: "blocking", PRIORITY_USER: "user", PRIORITY_PREFETCH: "prefetch"}
+
+# Downloads transferring at once, overall and per host (override with env vars)
+MAX_ACTIVE_DOWNLOADS = max(1, int(os.environ.get("SENGINE_MAX_ACTIVE_DOWNLOADS", "4")))
+MAX_DOWNLOADS_PER_HOST = max(1, int(os.environ.get("SENGINE_DOWNLOADS_PER_HOST", "3")))
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
+# Expected hashes arrive from request bodies and node data and end up in store paths
+_SHA256_RE = re.compile(r"[0-9a-fA-F]{64}")
+
+
+def is_sha256(value: str) -> bool:
+    """Whether value is a hex SHA256 digest (and so safe to use in a path)."""
+    return isinstance(value, str) and _SHA256_RE.fullmatch(value) is not None
+
+
+def _hash_file(path: str, length: Optional[int] = None, hasher=None):
+    """Feed the first length bytes (or all) of a file into a SHA256 hasher and return it."""
+    hasher = hasher or hashlib.sha256()
+    remaining = length
+    with open(path, 'rb') as f:
+        while remaining is None or remaining > 0:
+            chunk = f.read(1024 * 1024 if remaining is None else min(1024 * 1024, remaining))
+            if not chunk:
+                break
+            hasher.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return hasher
+
+
+class _BufferedWriter:
+    """Coalesces network chunks into one preallocated buffer and writes it out when full."""
+
+    def __init__(self, f, hasher=None, size: int = BUFFER_SIZE):
+        self._f = f  # Unbuffered file, so flushed bytes have reached the OS
+        self._hasher = hasher
+        self._buffer = bytearray(size)
+        self._view = memoryview(self._buffer)
+        self._filled = 0
+
+    def write(self, chunk) -> int:
+        """Buffer a chunk and return how many bytes were flushed to the file."""
+        src = memoryview(chunk)
+        flushed = 0
+        while src:
+            n = min(len(src), len(self._buffer) - self._filled)
+            self._view[self._filled:self._filled + n] = src[:n]
+            self._filled += n
+            src = src[n:]
+            if self._filled == len(self._buffer):
+                flushed += self.flush()
+        return flushed
+
+    def flush(self) -> int:
+        """Write out buffered bytes and return how many were written."""
+        data = self._view[:self._filled]
+        written = 0
+        while written < len(data):
+            written += self._f.write(data[written:])
+        if self._hasher is not None:
+            self._hasher.update(data)
+        self._filled = 0
+        return written
+
+
+class _Preempted(Exception):
+    """Raised inside a transfer that must yield to a higher-priority download."""
+
+
+class _DownloadTicket:
+    """A download's place in the scheduler."""
+
+    __slots__ = ("version_id", "host", "priority", "seq", "granted", "preempted")
+
+    def __init__(self, version_id: int, host: str, priority: int, seq: int, granted: asyncio.Future):
+        self.version_id = version_id
+        self.host = host
+        self.priority = priority
+        self.seq = seq
+        self.granted = granted
+        self.preempted = False
+
+
+class DownloadScheduler:
+    """
+    Admits downloads by priority under a global and a per-host concurrency limit.
+
+    Lives on the download loop. When a waiting download outranks a running
+    one that holds the slot it needs, the running transfer is preempted: it
+    stops at its next chunk, keeps its .part file and queues again to
+    resume once the slot frees up.
+    """
+
+    def __init__(self, max_active: int = MAX_ACTIVE_DOWNLOADS, max_per_host: int = MAX_DOWNLOADS_PER_HOST):
+        self.max_active = max_active
+        self.max_per_host = max_per_host
+        self._waiting: List[_DownloadTicket] = []
+        self._active: Dict[int, _DownloadTicket] = {}
+        self._seq = itertools.count()
+
+    async def acquire(self, version_id: int, host: str, priority: int, seq: Optional[int] = None) -> _DownloadTicket:
+        """Wait for a transfer slot. Pass the seq of a preempted ticket to keep its place in line."""
+        ticket = _DownloadTicket(
+            version_id, host, priority,
+            next(self._seq) if seq is None else seq,
+            asyncio.get_running_loop().create_future()
+        )
+        self._waiting = self._waiting + [ticket]
+        self._dispatch()
+        try:
+            await ticket.granted
+        except BaseException:
+            if ticket in self._waiting:
+                self._waiting = [t for t in self._waiting if t is not ticket]
+            self.release(ticket)
+            raise
+        return ticket
+
+    def release(self, ticket: _DownloadTicket):
+        """Give back a transfer slot and admit whoever is next."""
+        if self._active.get(ticket.version_id) is ticket:
+            del self._active[ticket.version_id]
+        self._dispatch()
+
+    def promote(self, version_id: int, priority: int):
+        """Raise the priority of a queued or running download (e.g. a prompt now waits on it)."""
+        for ticket in self._waiting + list(self._active.values()):
+            if ticket.version_id == version_id and priority < ticket.priority:
+                ticket.priority = priority
+        ticket = self._active.get(version_id)
+        if ticket is not None and ticket.preempted and ticket.priority == priority:
+            # Paused for a download it now ranks with; _dispatch pauses something else if still needed
+            if not any(t.priority < priority for t in self._waiting):
+                ticket.preempted = False
+        self._dispatch()
+
+    def is_preempted(self, version_id: int) -> bool:
+        """Whether the running transfer for version_id should stop and requeue."""
+        ticket = self._active.get(version_id)
+        return ticket is not None and ticket.preempted
+
+    def status(self, version_id: int) -> Optional[Dict]:
+        """Queue state of a download, or None if the scheduler does not know it."""
+        waiting = self._waiting
+        ticket = self._active.get(version_id)
+        if ticket is not None:
+            return {"state": "active", "priority": PRIORITY_NAMES[ticket.priority], "queue_depth": len(waiting)}
+        for position, ticket in enumerate(waiting, 1):
+            if ticket.version_id == version_id:
+                return {
+                    "state": "queued",
+                    "priority": PRIORITY_NAMES[ticket.priority],
+                    "queue_position": position,
+                    "queue_depth": len(waiting),
+                }
+        return None
+
+    def _dispatch(self):
+        # Lists are replaced rather than mutated so status() can read them from other threads
+        waiting = sorted(self._waiting, key=lambda t: (t.priority, t.seq))
+        freeing = sum(1 for t in self._active.values() if t.preempted)
+        for ticket in list(waiting):
+            host_load = sum(1 for t in self._active.values() if t.host == ticket.host)
+            host_full = host_load >= self.max_per_host
+            if len(self._active) < self.max_active and not host_full:
+                waiting.remove(ticket)
+                self._active[ticket.version_id] = ticket
+                if not ticket.granted.done():
+                    ticket.granted.set_result(None)
+            elif freeing:
+                # A preempted transfer is already on its way out
+                freeing -= 1
+            else:
+                self._preempt_for(ticket, host_full)
+        self._waiting = waiting
+
+    def _preempt_for(self, ticket: _DownloadTicket, host_full: bool):
+        candidates = [
+            t for t in self._active.values()
+            if t.priority > ticket.priority and not t.preempted and (not host_full or t.host == ticket.host)
+        ]
+        if not candidates:
+            return
+        victim = max(candidates, key=lambda t: (t.priority, t.seq))
+        victim.preempted = True
+        print(f"[SEngine] Pausing {PRIORITY_NAMES[victim.priority]} download of version {victim.version_id} "
+              f"for {PRIORITY_NAMES[ticket.priority]} download of version {ticket.version_id}")
+
+
+def _parse_content_range_total(content_range: str) -> int:
+    """Total size from a 'bytes start-end/total' Content-Range header, or 0."""
+    try:
+        total = content_range.rsplit("/", 1)[1]
+        return int(total) if total != "*" else 0
+    except (IndexError, ValueError):
+        return 0
 
 
 class LoRACacheManager:
@@ -25,87 +282,629 @@ class LoRACacheManager:
                 cache_dir = os.path.join(folder_paths.models_dir, "loras")
         self.cache_dir = cache_dir
         # Store manifest in plugin directory to track which files we downloaded
-        self.manifest_file = os.path.join(os.path.dirname(__file__), "cache", "manifest.json")
+        self.manifest_file = os.path.join(os.path.dirname(__file__), "cache", "manifest.db")
         os.makedirs(cache_dir, exist_ok=True)
         os.makedirs(os.path.dirname(self.manifest_file), exist_ok=True)
 
-        self._manifest = self._load_manifest()
+        # manifest.json of older versions is imported on first start
+        legacy_manifest = os.path.join(os.path.dirname(self.manifest_file), "manifest.json")
+        self._store = ManifestStore(self.manifest_file, legacy_json=legacy_manifest)
         self._download_progress: Dict[int, float] = {}
 
-    def _load_manifest(self) -> Dict:
-        """Load the manifest of downloaded LoRAs."""
-        try:
-            if os.path.exists(self.manifest_file):
-                with open(self.manifest_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except Exception as e:
-            print(f"[SEngine] Error loading manifest: {e}")
-        return {"files": {}}
+        # Transfers run on a dedicated event loop with one pooled aiohttp session
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        self._session: Optional[aiohttp.ClientSession] = None
 
-    def _save_manifest(self):
-        """Save the manifest to disk."""
-        try:
-            with open(self.manifest_file, 'w', encoding='utf-8') as f:
-                json.dump(self._manifest, f, indent=2)
-        except Exception as e:
-            print(f"[SEngine] Error saving manifest: {e}")
+        # One active transfer per version_id, later callers join it (download loop only)
+        self._inflight: Dict[int, asyncio.Future] = {}
+        # Highest priority any caller of an in-flight download asked for, read whenever it
+        # queues, so a promotion made before it reached the scheduler is not lost
+        self._inflight_priority: Dict[int, int] = {}
+        self._progress_listeners: Dict[int, List] = {}
+        self._scheduler = DownloadScheduler()
+
+        # Cross-process claims on downloads, so processes sharing the cache never fetch the same file twice
+        self._owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._claimed = set()
+        self._heartbeat_task: Optional[asyncio.Future] = None
+
+        # Disk budget bookkeeping
+        self._eviction_listeners: List = []
+        self._last_reconcile = 0.0
+        self._reconcile_lock = threading.Lock()
 
     def _get_full_path(self, file_info: Dict) -> str:
         """Construct full path from manifest entry."""
-        # Support both old format (local_path) and new format (file_name)
-        if "local_path" in file_info:
-            # Old format - check if file exists at stored path
-            if os.path.exists(file_info["local_path"]):
-                return file_info["local_path"]
-        # New format or fallback - construct from cache_dir + filename
+        # Absolute paths (migrated from very old manifests) survive the join unchanged
         filename = file_info.get("file_name", "")
         if filename:
             return os.path.join(self.cache_dir, filename)
         return ""
 
+    def _lookup(self, version_id: int) -> Optional[str]:
+        """
+        Path of a downloaded LoRA, reconciling its manifest row with the disk.
+
+        A file deleted behind our back is forgotten; a changed size or mtime
+        is recorded, dropping the stored hash if the file was replaced.
+        """
+        info = self._store.get_file(version_id)
+        if info is None:
+            return None
+        local_path = self._get_full_path(info)
+        try:
+            stat = os.stat(local_path)
+        except OSError:
+            self.remove_file(version_id)
+            return None
+        if stat.st_size != info["size"] or stat.st_mtime_ns != info["mtime_ns"]:
+            # Rows migrated from manifest.json have no mtime yet, that alone is no change
+            replaced = stat.st_size != info["size"] or info["mtime_ns"] != 0
+            self._store.update_stat(version_id, stat.st_size, stat.st_mtime_ns, rehash=replaced)
+        return local_path
+
+    def reconcile(self):
+        """Check every manifest row against the disk (one stat per file)."""
+        with self._reconcile_lock:
+            for info in self._store.all_files():
+                self._lookup(info["version_id"])
+            self._last_reconcile = time.time()
+
+    def _reconcile_if_stale(self):
+        """Start a background reconcile if the last one is older than RECONCILE_INTERVAL."""
+        if time.time() - self._last_reconcile < RECONCILE_INTERVAL or self._reconcile_lock.locked():
+            return
+        self._last_reconcile = time.time()
+        threading.Thread(target=self.reconcile, name="sengine-reconcile", daemon=True).start()
+
     def is_downloaded(self, version_id: int) -> bool:
         """Check if a LoRA version is already downloaded."""
-        str_id = str(version_id)
-        if str_id not in self._manifest.get("files", {}):
+        return self._lookup(version_id) is not None
+
+    def get_local_path(self, version_id: int, touch: bool = True) -> Optional[str]:
+        """
+        Get the local path for a downloaded LoRA, or None if not downloaded.
+
+        With touch, the file's last access is updated for LRU eviction
+        (pass touch=False when only reporting status).
+        """
+        local_path = self._lookup(version_id)
+        if local_path and touch:
+            self._store.touch(version_id, time.time(), ACCESS_SAVE_INTERVAL)
+        return local_path
+
+    def set_pinned(self, version_id: int, pinned: bool = True) -> bool:
+        """Pin a downloaded LoRA so eviction never deletes it. Returns False if not downloaded."""
+        return self._store.set_pinned(version_id, pinned)
+
+    def is_pinned(self, version_id: int) -> bool:
+        """Whether a downloaded LoRA is pinned."""
+        info = self._store.get_file(version_id)
+        return bool(info and info["pinned"])
+
+    def add_eviction_listener(self, callback):
+        """Register callback(version_id, local_path), called after a file is removed from the cache."""
+        self._eviction_listeners.append(callback)
+
+    def remove_file(self, version_id: int) -> bool:
+        """Delete a downloaded LoRA and forget it, e.g. when it is corrupted or evicted."""
+        info = self._store.remove_file(version_id)
+        if info is None:
             return False
-        file_info = self._manifest["files"][str_id]
-        local_path = self._get_full_path(file_info)
-        return local_path and os.path.exists(local_path)
-
-    def get_local_path(self, version_id: int) -> Optional[str]:
-        """Get the local path for a downloaded LoRA, or None if not downloaded."""
-        str_id = str(version_id)
-        if str_id in self._manifest.get("files", {}):
-            local_path = self._get_full_path(self._manifest["files"][str_id])
-            if local_path and os.path.exists(local_path):
+        local_path = self._get_full_path(info)
+        if local_path and os.path.lexists(local_path):
+            try:
+                os.remove(local_path)
+            except Exception as e:
+                print(f"[SEngine] Error removing {local_path}: {e}")
+        if CONTENT_STORE and info["sha256"] and not self._store.find_by_sha256(info["sha256"]):
+            # Last name linked to this content is gone
+            blob_path = self._blob_path(info["sha256"])
+            if os.path.exists(blob_path):
+                try:
+                    os.remove(blob_path)
+                except Exception as e:
+                    print(f"[SEngine] Error removing {blob_path}: {e}")
+        for callback in list(self._eviction_listeners):
+            try:
+                callback(version_id, local_path)
+            except Exception as e:
+                print(f"[SEngine] Eviction listener error: {e}")
+        return True
+
+    def _blob_path(self, sha256: str) -> str:
+        """Location of some content in the content-addressed store."""
+        if not is_sha256(sha256):
+            raise ValueError(f"Not a SHA256: {sha256!r}")
+        sha256 = sha256.lower()
+        return os.path.join(self.cache_dir, CONTENT_STORE_DIR, sha256[:2], sha256)
+
+    @staticmethod
+    def _link_file(source: str, dest: str):
+        """Make dest refer to the content of source: hardlink, else symlink, else copy."""
+        tmp_path = dest + ".link"
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            os.link(source, tmp_path)
+        except OSError:
+            try:
+                os.symlink(os.path.abspath(source), tmp_path)
+            except (OSError, NotImplementedError):
+                shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, dest)
+
+    def _find_content(self, sha256: str) -> Optional[str]:
+        """A file already on disk with the given SHA256, or None."""
+        if not is_sha256(sha256):
+            return None
+        if CONTENT_STORE:
+            blob_path = self._blob_path(sha256)
+            if os.path.exists(blob_path):
+                return blob_path
+        for info in self._store.find_by_sha256(sha256):
+            local_path = self._lookup(info["version_id"])
+            # _lookup drops the hash of a file that changed on disk
+            if local_path and self._store.get_file(info["version_id"])["sha256"]:
                 return local_path
         return None
 
+    def _store_content(self, part_path: str, local_path: str, sha256: str):
+        """Move a verified download into the content store and link its readable name to it."""
+        blob_path = self._blob_path(sha256)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        if os.path.exists(blob_path):
+            os.remove(part_path)
+        else:
+            os.replace(part_path, blob_path)
+        self._link_file(blob_path, local_path)
+
+    def _adopt_content(self, version_id: int, file_name: str, source: str, sha256: str) -> Tuple[bool, str]:
+        """Register content already on disk under a version, instead of downloading it again."""
+        safe_filename = f"{version_id}_{file_name}"
+        local_path = os.path.join(self.cache_dir, safe_filename)
+        if CONTENT_STORE and not source.startswith(os.path.join(self.cache_dir, CONTENT_STORE_DIR)):
+            # Move the existing copy into the store first, so both names share it
+            blob_path = self._blob_path(sha256)
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            self._link_file(source, blob_path)
+            source = blob_path
+        self._link_file(source, local_path)
+        stat = os.stat(local_path)
+        self._store.put_file(
+            version_id,
+            file_name=safe_filename,
+            original_name=file_name,
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            sha256=sha256.lower(),
+            verified=True,
+            last_access=time.time(),
+        )
+        self._clear_partial(version_id, remove_file=True)
+        # Linking is free, but a copy (no hardlinks or symlinks) takes space like a download
+        self.enforce_disk_budget(keep=(version_id,))
+        print(f"[SEngine] Reusing content already on disk for version {version_id} ({source})")
+        return (True, local_path)
+
+    def _disk_usage(self) -> int:
+        """Bytes the cached files take, counting content shared by several names once."""
+        return self._store.totals()[1] - self._store.shared_bytes()
+
+    def get_disk_headroom(self) -> Optional[int]:
+        """Bytes left under DISK_BUDGET, or None if the cache is unlimited."""
+        if DISK_BUDGET <= 0:
+            return None
+        return max(DISK_BUDGET - self._disk_usage(), 0)
+
+    def enforce_disk_budget(self, keep=()) -> List[int]:
+        """
+        Delete least recently used LoRAs until the cache fits in DISK_BUDGET.
+
+        Pinned files, version_ids in keep and files used within
+        EVICTION_GRACE_SECONDS are never evicted. Names sharing content
+        (same SHA256) are evicted together, as deleting only some of them
+        frees nothing, and their bytes count once.
+
+        Returns:
+            List of evicted version_ids
+        """
+        if DISK_BUDGET <= 0:
+            return []
+        used = self._disk_usage()
+        if used <= DISK_BUDGET:
+            return []
+        now = time.time()
+        keep = {int(version_id) for version_id in keep}
+
+        evicted = []
+        for info in self._store.eviction_order():
+            if used <= DISK_BUDGET:
+                break
+            size = info["size"]
+            names = self._store.find_by_sha256(info["sha256"]) if info["sha256"] else [info]
+            if any(name["version_id"] in keep or name.get("pinned")
+                   or now - name["last_access"] < EVICTION_GRACE_SECONDS for name in names):
+                continue
+            removed = [name["version_id"] for name in names if self.remove_file(name["version_id"])]
+            if removed:
+                used -= size
+                evicted.extend(removed)
+                print(f"[SEngine] Evicted from disk: version(s) {', '.join(map(str, removed))} "
+                      f"({size / (1024*1024):.1f} MB)")
+        if used > DISK_BUDGET:
+            print(f"[SEngine] LoRA cache is {used / (1024*1024):.0f} MB, over its "
+                  f"{DISK_BUDGET / (1024*1024):.0f} MB budget (remaining files are pinned or in use)")
+        return evicted
+
+    def get_file_size(self, version_id: int) -> int:
+        """Size in bytes of a downloaded LoRA as recorded in the manifest, 0 if not downloaded."""
+        info = self._store.get_file(version_id)
+        return info["size"] if info else 0
+
     def get_download_progress(self, version_id: int) -> float:
         """Get download progress for a LoRA (0-1, or -1 if not downloading)."""
         return self._download_progress.get(version_id, -1)
 
-    def download_lora_sync(
+    def get_queue_status(self, version_id: int) -> Optional[Dict]:
+        """Scheduler state of a download (state, priority, queue_position, queue_depth) or None."""
+        return self._scheduler.status(version_id)
+
+    def _get_part_path(self, safe_filename: str) -> str:
+        """Path of the in-progress download for a cache filename."""
+        return os.path.join(self.cache_dir, safe_filename + PARTIAL_SUFFIX)
+
+    def _get_resume_offset(self, version_id: int, safe_filename: str) -> int:
+        """Bytes of a previous partial download that can be resumed, or 0."""
+        info = self._store.get_partial(version_id)
+        part_path = self._get_part_path(safe_filename)
+        if not info or info.get("file_name") != safe_filename or not os.path.exists(part_path):
+            return 0
+        downloaded = int(info.get("downloaded", 0))
+        if info.get("segments"):
+            # Only the contiguous prefix is usable for a single-stream resume
+            for start, end, done in info["segments"]:
+                downloaded = start + done
+                if start + done < end:
+                    break
+        return min(downloaded, os.path.getsize(part_path))
+
+    def _set_partial(
         self,
         version_id: int,
+        safe_filename: str,
         file_name: str,
-        api_key: str = "",
-        progress_callback=None,
-        download_url: str = ""
+        downloaded: int,
+        total_size: int,
+        segments: Optional[List[List[int]]] = None
+    ):
+        """Record how far a download got so it can be resumed later."""
+        self._store.set_partial(version_id, safe_filename, file_name, downloaded, total_size, segments)
+
+    def _clear_partial(self, version_id: int, remove_file: bool = False):
+        """Forget a partial download, optionally deleting its .part file."""
+        info = self._store.pop_partial(version_id)
+        if remove_file and info:
+            part_path = self._get_part_path(info.get("file_name", ""))
+            if os.path.exists(part_path):
+                try:
+                    os.remove(part_path)
+                except OSError:
+                    pass
+
+    def _reserve_space(self, path: str, size: int):
+        """Check free disk space and preallocate a file of the given size."""
+        free = shutil.disk_usage(self.cache_dir).free
+        if free < size:
+            raise OSError(
+                f"Not enough disk space: need {size / (1024*1024):.1f} MB, "
+                f"{free / (1024*1024):.1f} MB free"
+            )
+        with open(path, 'wb') as f:
+            try:
+                os.posix_fallocate(f.fileno(), 0, size)
+            except (AttributeError, OSError):
+                # No fallocate (Windows/macOS or unsupported filesystem)
+                f.truncate(size)
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Start (once) the background event loop that runs all transfers."""
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="sengine-download", daemon=True)
+                thread.start()
+                self._loop = loop
+            return self._loop
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Shared, connection-pooled session (created on the download loop)."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=DOWNLOAD_CONNECTIONS, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=60),
+                headers={"User-Agent": USER_AGENT},
+            )
+        return self._session
+
+    def _notify_progress(self, version_id: int, progress: float):
+        """Forward progress of a shared transfer to every caller waiting on it."""
+        for callback in list(self._progress_listeners.get(version_id, ())):
+            try:
+                callback(version_id, progress)
+            except Exception as e:
+                print(f"[SEngine] Progress callback error: {e}")
+
+    async def _download_shared(
+        self,
+        version_id: int,
+        file_name: str,
+        api_key: str,
+        progress_callback,
+        download_url: str,
+        expected_sha256: str,
+        priority: int
     ) -> Tuple[bool, str]:
-        """
-        Download a LoRA file synchronously.
+        """Start a download, or join the one already running for this version_id."""
+        listeners = self._progress_listeners.setdefault(version_id, [])
+        if progress_callback:
+            listeners.append(progress_callback)
 
-        Args:
-            version_id: The Civitai model version ID
-            file_name: The original filename
-            api_key: Civitai API key for authenticated downloads
-            progress_callback: Optional callback(version_id, progress)
-            download_url: Direct download URL (preferred)
+        task = self._inflight.get(version_id)
+        if task is None:
+            if not download_url:
+                download_url = get_civitai_api(api_key).get_download_url(version_id)
+            self._inflight_priority[version_id] = priority
+            task = asyncio.ensure_future(self._run_scheduled(
+                version_id, file_name, api_key, download_url, expected_sha256, priority
+            ))
+            self._inflight[version_id] = task
 
-        Returns:
-            Tuple of (success, local_path or error_message)
+            def _finished(_):
+                self._inflight.pop(version_id, None)
+                self._inflight_priority.pop(version_id, None)
+                self._progress_listeners.pop(version_id, None)
+            task.add_done_callback(_finished)
+        else:
+            print(f"[SEngine] Joining in-flight download of version {version_id}")
+            self._inflight_priority[version_id] = min(self._inflight_priority.get(version_id, priority), priority)
+            self._scheduler.promote(version_id, priority)
+
+        try:
+            # Shielded so a caller giving up does not abort the transfer for the others
+            return await asyncio.shield(task)
+        finally:
+            if progress_callback in listeners:
+                listeners.remove(progress_callback)
+
+    async def _run_scheduled(
+        self,
+        version_id: int,
+        file_name: str,
+        api_key: str,
+        download_url: str,
+        expected_sha256: str,
+        priority: int
+    ) -> Tuple[bool, str]:
+        """Run a download whenever the scheduler admits it, requeueing it after a preemption."""
+        await self._acquire_claim(version_id)
+        try:
+            host = urlsplit(download_url).hostname or ""
+            seq = None
+            while True:
+                # Callers that joined meanwhile (e.g. while waiting on another process) may rank higher
+                priority = min(priority, self._inflight_priority.get(version_id, priority))
+                ticket = await self._scheduler.acquire(version_id, host, priority, seq)
+                try:
+                    # Returns at once if another process finished the file meanwhile
+                    result = await self._download(
+                        version_id, file_name, api_key, self._notify_progress, download_url, expected_sha256
+                    )
+                finally:
+                    self._scheduler.release(ticket)
+                if result[0] or not ticket.preempted:
+                    return result
+                # Paused with its .part file kept, wait for the slot again
+                seq, priority = ticket.seq, ticket.priority
+        finally:
+            self._claimed.discard(version_id)
+            self._store.release_claim(version_id, self._owner)
+
+    async def _acquire_claim(self, version_id: int):
+        """Wait until no other process is downloading version_id, then claim it."""
+        waiting = False
+        while True:
+            holder = self._store.claim(version_id, self._owner, time.time(), CLAIM_TTL)
+            if holder is None:
+                break
+            if not waiting:
+                print(f"[SEngine] Version {version_id} is being downloaded by another process ({holder}), waiting")
+                waiting = True
+            # Relay the other process's progress from its checkpoints
+            partial = self._store.get_partial(version_id)
+            if partial and partial["total_size"]:
+                self._notify_progress(version_id, partial["downloaded"] / partial["total_size"])
+            await asyncio.sleep(CLAIM_POLL_INTERVAL)
+
+        self._claimed.add(version_id)
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.ensure_future(self._claim_heartbeat())
+
+    async def _claim_heartbeat(self):
+        """Keep this process's claims alive while it holds any."""
+        while self._claimed:
+            try:
+                self._store.refresh_claims(self._owner, time.time())
+            except Exception as e:
+                print(f"[SEngine] Claim heartbeat failed: {e}")
+            await asyncio.sleep(CLAIM_TTL / 3)
+
+    async def _stream_single(
+        self,
+        response: aiohttp.ClientResponse,
+        part_path: str,
+        downloaded: int,
+        total_size: int,
+        version_id: int,
+        safe_filename: str,
+        file_name: str,
+        hasher,
+        progress_callback=None
+    ) -> int:
+        """Write a single response stream into the .part file from the given offset, hashing as it goes."""
+        if downloaded > 0:
+            # Bring the hash up to the resume point
+            await asyncio.get_running_loop().run_in_executor(None, _hash_file, part_path, downloaded, hasher)
+
+        with open(part_path, 'r+b', buffering=0) as f:
+            f.seek(downloaded)
+            writer = _BufferedWriter(f, hasher)
+            last_checkpoint = downloaded
+
+            try:
+                async for chunk in response.content.iter_any():
+                    if self._scheduler.is_preempted(version_id):
+                        raise _Preempted("Paused for a higher-priority download")
+                    flushed = writer.write(chunk)
+                    if not flushed:
+                        continue
+                    downloaded += flushed
+
+                    # Persist progress so a restart can resume from here
+                    if downloaded - last_checkpoint >= CHECKPOINT_BYTES:
+                        self._set_partial(version_id, safe_filename, file_name, downloaded, total_size)
+                        last_checkpoint = downloaded
+
+                    if total_size > 0:
+                        progress = downloaded / total_size
+                        self._download_progress[version_id] = progress
+                        if progress_callback:
+                            progress_callback(version_id, progress)
+
+                        # Print progress periodically
+                        mb_done = downloaded / (1024 * 1024)
+                        mb_total = total_size / (1024 * 1024)
+                        print(f"[SEngine] Progress: {mb_done:.1f}/{mb_total:.1f} MB")
+            except Exception:
+                # Keep what was received so the caller records a resumable partial
+                downloaded += writer.flush()
+                self._set_partial(version_id, safe_filename, file_name, downloaded, total_size)
+                raise
+
+            downloaded += writer.flush()
+            if total_size == 0 or downloaded == total_size:
+                f.truncate(downloaded)
+        return downloaded
+
+    def _plan_segments(self, version_id: int, safe_filename: str, total_size: int, resume_from: int, response) -> Optional[List[List[int]]]:
+        """
+        Split a download into [start, end, done] byte ranges for parallel fetching.
+
+        Returns None to use a single stream: segmenting disabled, the server
+        did not honor the Range probe, the file is too small, or a
+        single-stream partial download is being resumed.
         """
+        if DOWNLOAD_SEGMENTS < 2 or response.status != 206 or total_size <= 0:
+            return None
+
+        info = self._store.get_partial(version_id)
+        if (info and info.get("segments") and info.get("file_name") == safe_filename
+                and info.get("total_size") == total_size
+                and os.path.exists(self._get_part_path(safe_filename))):
+            return info["segments"]
+        if resume_from > 0:
+            return None
+
+        count = min(DOWNLOAD_SEGMENTS, total_size // max(MIN_SEGMENT_SIZE, 1))
+        if count < 2:
+            return None
+        size = -(-total_size // count)
+        return [[start, min(start + size, total_size), 0] for start in range(0, total_size, size)]
+
+    async def _fetch_segment(self, version_id: int, url: str, part_path: str, segment: List[int], on_flushed):
+        """Fetch one byte range into its offset of the preallocated .part file."""
+        start, end = segment[0], segment[1]
+        pos = start + segment[2]
+        if pos >= end:
+            return
+
+        session = await self._get_session()
+        async with session.get(url, headers={"Range": f"bytes={pos}-{end - 1}"}) as response:
+            if response.status != 206:
+                raise IOError(f"Server ignored range request for bytes {pos}-{end - 1}")
+
+            with open(part_path, 'r+b', buffering=0) as f:
+                f.seek(pos)
+                writer = _BufferedWriter(f)
+                received = pos
+                async for chunk in response.content.iter_any():
+                    if self._scheduler.is_preempted(version_id):
+                        raise _Preempted("Paused for a higher-priority download")
+                    chunk = chunk[:end - received]
+                    received += len(chunk)
+                    flushed = writer.write(chunk)
+                    if flushed:
+                        on_flushed(segment, flushed)
+                    if received >= end:
+                        break
+                flushed = writer.flush()
+                if flushed:
+                    on_flushed(segment, flushed)
+
+        if start + segment[2] < end:
+            raise IOError(f"Connection closed early for bytes {start}-{end - 1}")
+
+    async def _download_segments(
+        self,
+        url: str,
+        part_path: str,
+        segments: List[List[int]],
+        total_size: int,
+        version_id: int,
+        safe_filename: str,
+        file_name: str,
+        progress_callback=None
+    ) -> int:
+        """Fetch all segments concurrently and return the total bytes downloaded."""
+        downloaded = [sum(seg[2] for seg in segments)]
+        last_checkpoint = [downloaded[0]]
+
+        def on_flushed(segment, nbytes):
+            segment[2] += nbytes
+            downloaded[0] += nbytes
+            progress = downloaded[0] / total_size
+            self._download_progress[version_id] = progress
+            if progress_callback:
+                progress_callback(version_id, progress)
+            if downloaded[0] - last_checkpoint[0] >= CHECKPOINT_BYTES:
+                self._set_partial(version_id, safe_filename, file_name, downloaded[0], total_size, segments)
+                last_checkpoint[0] = downloaded[0]
+                print(f"[SEngine] Progress: {downloaded[0] / (1024*1024):.1f}/{total_size / (1024*1024):.1f} MB")
+
+        pending = [seg for seg in segments if seg[2] < seg[1] - seg[0]]
+        print(f"[SEngine] Segmented download: {len(pending)} of {len(segments)} range(s) remaining")
+
+        tasks = [asyncio.ensure_future(self._fetch_segment(version_id, url, part_path, seg, on_flushed)) for seg in pending]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return downloaded[0]
+
+    async def _download(
+        self,
+        version_id: int,
+        file_name: str,
+        api_key: str = "",
+        progress_callback=None,
+        download_url: str = "",
+        expected_sha256: str = ""
+    ) -> Tuple[bool, str]:
+        """Download a LoRA file on the download loop (see download_lora_sync)."""
         # Check if already downloaded
         existing_path = self.get_local_path(version_id)
         if existing_path:
@@ -116,11 +915,30 @@ class LoRACacheManager:
             api = get_civitai_api(api_key)
             download_url = api.get_download_url(version_id)
 
+        if not expected_sha256:
+            expected_sha256 = get_civitai_api(api_key).get_cached_file_hash(version_id)
+        if expected_sha256 and not is_sha256(expected_sha256):
+            return (False, f"Invalid SHA256 for version {version_id}: {expected_sha256!r}")
+
+        # Never download content whose hash is already on disk
+        existing_content = self._find_content(expected_sha256)
+        if existing_content:
+            try:
+                return self._adopt_content(version_id, file_name, existing_content, expected_sha256)
+            except Exception as e:
+                print(f"[SEngine] Could not reuse {existing_content}, downloading instead: {e}")
+
         # Determine local filename
         safe_filename = f"{version_id}_{file_name}"
         local_path = os.path.join(self.cache_dir, safe_filename)
+        part_path = self._get_part_path(safe_filename)
 
         self._download_progress[version_id] = 0.0
+        resume_from = self._get_resume_offset(version_id, safe_filename)
+        downloaded = resume_from
+        total_size = 0
+        segments = None
+        hasher = hashlib.sha256()
 
         try:
             # Add token to URL for Civitai
@@ -130,109 +948,183 @@ class LoRACacheManager:
 
             print(f"[SEngine] Downloading from: {download_url[:100]}...")
 
-            # Create request with headers
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                "Content-Type": "application/json",
-            }
-
-            request = urllib.request.Request(download_url, headers=headers)
+            headers = {}
+            if resume_from > 0:
+                headers["Range"] = f"bytes={resume_from}-"
+                print(f"[SEngine] Resuming from {resume_from / (1024*1024):.1f} MB")
+            elif DOWNLOAD_SEGMENTS > 1:
+                # Probe for range support, a 206 reply means we can segment
+                headers["Range"] = "bytes=0-"
 
-            # Create SSL context
-            ssl_context = ssl.create_default_context()
+            session = await self._get_session()
+            async with session.get(download_url, headers=headers) as response:
+                if response.status >= 400:
+                    error_msg = f"HTTP Error {response.status}: {response.reason}"
+                    print(f"[SEngine] {error_msg}")
+                    if response.status == 416:
+                        # Stale partial state, start over next time
+                        self._clear_partial(version_id, remove_file=True)
+                    self._download_progress.pop(version_id, None)
+                    return (False, error_msg)
 
-            # Download
-            with urllib.request.urlopen(request, context=ssl_context) as response:
-                total_size = int(response.headers.get('content-length', 0))
-                content_type = response.headers.get('content-type', '')
-                downloaded = 0
+                content_length = response.content_length or 0
+                content_type = response.headers.get('Content-Type', '')
 
                 print(f"[SEngine] Response content-type: {content_type}")
-                print(f"[SEngine] Expected size: {total_size / (1024*1024):.1f} MB")
 
                 # Check if we got an HTML page instead of a file
                 if 'text/html' in content_type.lower():
+                    self._clear_partial(version_id, remove_file=True)
+                    self._download_progress.pop(version_id, None)
                     return (False, "Download URL returned HTML page instead of file. Check API key or URL.")
 
-                with open(local_path, 'wb') as f:
-                    while True:
-                        chunk = response.read(65536)  # 64KB chunks
-                        if not chunk:
-                            break
-                        f.write(chunk)
-                        downloaded += len(chunk)
-
-                        if total_size > 0:
-                            progress = downloaded / total_size
-                            self._download_progress[version_id] = progress
-                            if progress_callback:
-                                progress_callback(version_id, progress)
+                if response.status == 206:
+                    total_size = _parse_content_range_total(response.headers.get('Content-Range', ''))
+                    if not total_size and content_length:
+                        total_size = resume_from + content_length
+                else:
+                    # Fresh download, or the server ignored the Range header
+                    if resume_from > 0:
+                        print("[SEngine] Server does not support resume, restarting download")
+                    downloaded = 0
+                    total_size = content_length
 
-                        # Print progress periodically
-                        if total_size > 0 and downloaded % (1024 * 1024) < 65536:
-                            mb_done = downloaded / (1024 * 1024)
-                            mb_total = total_size / (1024 * 1024)
-                            print(f"[SEngine] Progress: {mb_done:.1f}/{mb_total:.1f} MB")
+                print(f"[SEngine] Expected size: {total_size / (1024*1024):.1f} MB")
 
-            # Verify download
-            if os.path.exists(local_path):
-                actual_size = os.path.getsize(local_path)
+                segments = self._plan_segments(version_id, safe_filename, total_size, resume_from, response)
+                # Segments reuse the resolved (redirected, signed) URL
+                segment_url = str(response.url)
 
-                if actual_size == 0:
-                    os.remove(local_path)
-                    return (False, "Download produced empty file")
+                if segments is None or not any(seg[2] for seg in segments):
+                    if downloaded == 0 and total_size > 0:
+                        self._reserve_space(part_path, total_size)
+                    elif downloaded == 0:
+                        open(part_path, 'wb').close()
+                self._set_partial(version_id, safe_filename, file_name, downloaded, total_size, segments)
 
-                # Verify size matches expected if we got content-length
-                if total_size > 0 and actual_size != total_size:
-                    print(f"[SEngine] Size mismatch: expected {total_size}, got {actual_size}")
-                    os.remove(local_path)
-                    return (False, f"Download incomplete: {actual_size}/{total_size} bytes")
+                if segments is None:
+                    downloaded = await self._stream_single(
+                        response, part_path, downloaded, total_size,
+                        version_id, safe_filename, file_name, hasher, progress_callback
+                    )
 
-                print(f"[SEngine] Download verification passed ({actual_size} bytes)")
+            if segments is not None:
+                downloaded = await self._download_segments(
+                    segment_url, part_path, segments, total_size,
+                    version_id, safe_filename, file_name, progress_callback
+                )
+                # Ranges arrive out of order, hash the assembled file while it is in page cache
+                hasher = await asyncio.get_running_loop().run_in_executor(None, _hash_file, part_path, downloaded)
 
-                # Update manifest - store only filename, not full path
-                if "files" not in self._manifest:
-                    self._manifest["files"] = {}
+            # Verify download
+            if downloaded == 0:
+                self._clear_partial(version_id, remove_file=True)
+                self._download_progress.pop(version_id, None)
+                return (False, "Download produced empty file")
 
-                self._manifest["files"][str(version_id)] = {
-                    "file_name": safe_filename,  # Just the filename, not full path
-                    "original_name": file_name,
-                    "version_id": version_id,
-                }
-                self._save_manifest()
+            # Verify size matches expected if we know the total
+            if total_size > 0 and downloaded != total_size:
+                print(f"[SEngine] Size mismatch: expected {total_size}, got {downloaded}")
+                self._set_partial(version_id, safe_filename, file_name, downloaded, total_size, segments)
+                self._download_progress.pop(version_id, None)
+                return (False, f"Download incomplete: {downloaded}/{total_size} bytes (will resume)")
 
-                if version_id in self._download_progress:
-                    del self._download_progress[version_id]
+            sha256 = hasher.hexdigest()
+            if expected_sha256 and sha256.lower() != expected_sha256.lower():
+                print(f"[SEngine] Hash mismatch: expected {expected_sha256.lower()}, got {sha256}")
+                self._clear_partial(version_id, remove_file=True)
+                self._download_progress.pop(version_id, None)
+                return (False, "Downloaded file failed SHA256 verification")
 
-                print(f"[SEngine] Download complete: {local_path}")
-                return (True, local_path)
+            print(f"[SEngine] Download verification passed ({downloaded} bytes, sha256 {sha256[:12]}...)")
+            if CONTENT_STORE:
+                self._store_content(part_path, local_path, sha256)
             else:
-                return (False, "Download produced no file")
+                os.replace(part_path, local_path)
 
-        except urllib.error.HTTPError as e:
-            error_msg = f"HTTP Error {e.code}: {e.reason}"
-            print(f"[SEngine] {error_msg}")
-            if os.path.exists(local_path):
-                try:
-                    os.remove(local_path)
-                except:
-                    pass
-            if version_id in self._download_progress:
-                del self._download_progress[version_id]
-            return (False, error_msg)
+            # Update manifest - store only filename, not full path
+            self._store.put_file(
+                version_id,
+                file_name=safe_filename,
+                original_name=file_name,
+                size=downloaded,
+                mtime_ns=os.stat(local_path).st_mtime_ns,
+                sha256=sha256,
+                verified=expected_sha256 != "",
+                last_access=time.time(),
+            )
+            self._store.pop_partial(version_id)
+
+            self._download_progress.pop(version_id, None)
+            self.enforce_disk_budget(keep=(version_id,))
+
+            print(f"[SEngine] Download complete: {local_path}")
+            return (True, local_path)
 
         except Exception as e:
-            error_msg = str(e)
-            print(f"[SEngine] Download error: {error_msg}")
-            if os.path.exists(local_path):
-                try:
-                    os.remove(local_path)
-                except:
-                    pass
-            if version_id in self._download_progress:
-                del self._download_progress[version_id]
+            error_msg = str(e) or type(e).__name__
+            if isinstance(e, _Preempted):
+                print(f"[SEngine] Download of version {version_id} paused")
+            else:
+                print(f"[SEngine] Download error: {error_msg}")
+            if segments:
+                downloaded = sum(seg[2] for seg in segments)
+            else:
+                downloaded = (self._store.get_partial(version_id) or {}).get("downloaded", downloaded)
+            if downloaded > 0:
+                # Keep the partial file for a later resume
+                self._set_partial(version_id, safe_filename, file_name, downloaded, total_size, segments)
+                print(f"[SEngine] Kept partial download ({downloaded / (1024*1024):.1f} MB) for resume")
+            else:
+                self._clear_partial(version_id, remove_file=True)
+            self._download_progress.pop(version_id, None)
             return (False, error_msg)
 
+    def download_lora_sync(
+        self,
+        version_id: int,
+        file_name: str,
+        api_key: str = "",
+        progress_callback=None,
+        download_url: str = "",
+        expected_sha256: str = "",
+        priority: int = PRIORITY_USER
+    ) -> Tuple[bool, str]:
+        """
+        Download a LoRA file, blocking until it finishes (for node execution).
+
+        Concurrent calls for the same version_id share one transfer: later
+        callers wait for it, get its result and receive its progress.
+
+        Data is written to a .part file whose progress is tracked in the
+        manifest, so an interrupted transfer resumes with a Range request.
+        The SHA256 is computed while the data streams in, checked against
+        Civitai's published hash and stored in the manifest.
+
+        Args:
+            version_id: The Civitai model version ID
+            file_name: The original filename
+            api_key: Civitai API key for authenticated downloads
+            progress_callback: Optional callback(version_id, progress), called
+                from the download thread
+            download_url: Direct download URL (preferred)
+            expected_sha256: Civitai's SHA256 for the file (looked up in the
+                cached catalog if empty)
+            priority: PRIORITY_BLOCKING, PRIORITY_USER or PRIORITY_PREFETCH;
+                decides the order in which queued downloads start and which
+                running ones may be paused for them
+
+        Returns:
+            Tuple of (success, local_path or error_message)
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self._download_shared(
+                version_id, file_name, api_key, progress_callback, download_url, expected_sha256, priority
+            ),
+            self._get_loop()
+        )
+        return future.result()
+
     # Async version for server routes
     async def download_lora(
         self,
@@ -240,25 +1132,22 @@ class LoRACacheManager:
         file_name: str,
         api_key: str = "",
         progress_callback=None,
-        download_url: str = ""
+        download_url: str = "",
+        expected_sha256: str = "",
+        priority: int = PRIORITY_USER
     ) -> Tuple[bool, str]:
-        """Async wrapper that calls sync download in executor."""
-        import asyncio
-        import functools
-        loop = asyncio.get_event_loop()
-        func = functools.partial(
-            self.download_lora_sync,
-            version_id,
-            file_name,
-            api_key,
-            progress_callback,
-            download_url
+        """Download a LoRA file from any event loop without blocking it (see download_lora_sync)."""
+        future = asyncio.run_coroutine_threadsafe(
+            self._download_shared(
+                version_id, file_name, api_key, progress_callback, download_url, expected_sha256, priority
+            ),
+            self._get_loop()
         )
-        return await loop.run_in_executor(None, func)
+        return await asyncio.wrap_future(future)
 
     def clear_cache(self):
-        """Clear all cached LoRA files."""
-        for str_id, info in list(self._manifest.get("files", {}).items()):
+        """Clear all cached LoRA files and partial downloads."""
+        for info in self._store.all_files():
             local_path = self._get_full_path(info)
             if local_path and os.path.exists(local_path):
                 try:
@@ -266,26 +1155,26 @@ class LoRACacheManager:
                 except Exception as e:
                     print(f"[SEngine] Error removing {local_path}: {e}")
 
-        self._manifest = {"files": {}}
-        self._save_manifest()
+        for info in self._store.all_partials():
+            part_path = self._get_part_path(info.get("file_name", ""))
+            if os.path.exists(part_path):
+                try:
+                    os.remove(part_path)
+                except Exception as e:
+                    print(f"[SEngine] Error removing {part_path}: {e}")
+
+        self._store.clear()
+        shutil.rmtree(os.path.join(self.cache_dir, CONTENT_STORE_DIR), ignore_errors=True)
 
     def get_cache_size(self) -> int:
-        """Get total size of cached files in bytes."""
-        total = 0
-        for str_id, info in self._manifest.get("files", {}).items():
-            local_path = self._get_full_path(info)
-            if local_path and os.path.exists(local_path):
-                total += os.path.getsize(local_path)
-        return total
+        """Get total size of cached files in bytes (from the manifest's running totals, shared content once)."""
+        self._reconcile_if_stale()
+        return self._disk_usage()
 
     def get_cached_count(self) -> int:
-        """Get number of cached LoRA files."""
-        count = 0
-        for str_id, info in self._manifest.get("files", {}).items():
-            local_path = self._get_full_path(info)
-            if local_path and os.path.exists(local_path):
-                count += 1
-        return count
+        """Get number of cached LoRA files (from the manifest's running totals)."""
+        self._reconcile_if_stale()
+        return self._store.totals()[0]
 
 
 # Global instance
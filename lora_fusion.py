@@ -0,0 +1,185 @@
+"""
+Fusion of a LoRA stack into a single combined patch set.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import torch
+import comfy.lora
+
+try:
+    from comfy.lora_convert import convert_lora
+except ImportError:  # Older ComfyUI without LoRA format conversion
+    def convert_lora(sd):
+        return sd
+
+
+def _lowrank_weights(patch) -> Optional[tuple]:
+    """(up, down, alpha) of a plain low-rank LoRA patch, or None if it cannot be fused."""
+    if isinstance(patch, tuple) and len(patch) == 2 and patch[0] == "lora":
+        weights = patch[1]  # Legacy ("lora", weights) tuples
+    elif getattr(patch, "name", None) == "lora" and hasattr(patch, "weights"):
+        weights = patch.weights  # comfy.weight_adapter.LoRAAdapter
+    else:
+        return None
+
+    # mid (LoCon tucker), dora_scale and reshape change how the delta is built
+    extras = weights[3:6]
+    if any(extra is not None for extra in extras):
+        return None
+    return weights[0], weights[1], weights[2]
+
+
+# Position of dora_scale in the weights of each adapter type (legacy tuples and
+# comfy.weight_adapter classes share the layout)
+_DORA_SCALE_INDEX = {"lora": 4, "loha": 7, "lokr": 8, "glora": 5}
+
+
+def _patch_name_and_weights(patch) -> tuple:
+    if isinstance(patch, tuple) and len(patch) == 2 and isinstance(patch[0], str):
+        return patch[0], patch[1]
+    return getattr(patch, "name", None), getattr(patch, "weights", None)
+
+
+def _is_order_dependent(patch) -> bool:
+    """
+    Whether the result of patch depends on the patches applied to its key before it.
+
+    Plain deltas add up in any order; DoRA normalizes against the weight as
+    patched so far and "set" replaces it. Unknown patch types count as
+    order-dependent.
+    """
+    name, weights = _patch_name_and_weights(patch)
+    if name == "diff":
+        return False
+    if name not in _DORA_SCALE_INDEX or weights is None:
+        return True
+    index = _DORA_SCALE_INDEX[name]
+    return len(weights) > index and weights[index] is not None
+
+
+def _make_lowrank_patch(template, up: torch.Tensor, down: torch.Tensor):
+    """Build a low-rank patch in the same format as template, with scaling baked in."""
+    weights = (up, down, None, None, None, None)
+    if isinstance(template, tuple):
+        return ("lora", weights)
+    return type(template)(set(), weights)
+
+
+def _fuse_parts(parts: List[tuple]):
+    """
+    Fold several scaled low-rank deltas for one key into a single low-rank patch.
+
+    sum_i s_i * up_i @ down_i == [s_1*up_1 | s_2*up_2 | ...] @ [down_1; down_2; ...]
+    so the result is exact and stays low-rank (rank = sum of ranks).
+    Each part is (up, down, scale, original_patch, strength).
+    """
+    ups = [part[0].flatten(start_dim=1) for part in parts]
+    downs = [part[1].flatten(start_dim=1) for part in parts]
+    if len({u.shape[0] for u in ups}) != 1 or len({d.shape[1] for d in downs}) != 1:
+        return None
+
+    dtype = ups[0].dtype
+    for t in ups + downs:
+        dtype = torch.promote_types(dtype, t.dtype)
+
+    scaled = [u.to(dtype) if part[2] == 1.0 else u.to(dtype) * part[2] for u, part in zip(ups, parts)]
+    if len(parts) == 1:
+        return _make_lowrank_patch(parts[0][3], scaled[0], downs[0].to(dtype))
+    up = torch.cat(scaled, dim=1)
+    down = torch.cat([d.to(dtype) for d in downs], dim=0)
+    return _make_lowrank_patch(parts[0][3], up, down)
+
+
+def fuse_lora_stack(model, clip, stack: List[Tuple[Dict, float, float]]) -> List[Tuple[str, Dict, float]]:
+    """
+    Build a fused patch set for a LoRA stack.
+
+    Args:
+        model: ModelPatcher the stack is applied to (or None)
+        clip: CLIP the stack is applied to (or None)
+        stack: List of (lora_state_dict, strength_model, strength_clip) in order
+
+    Returns:
+        List of (target, patches, strength) where target is "model" or "clip".
+        Plain low-rank patches of all LoRAs are folded into one set per target
+        with strength 1.0; patches that cannot be fused (DoRA, LoKr, LoHa,
+        full diffs, ...) follow as separate sets with their own strength.
+        Keys with an order-dependent patch (DoRA, "set") are not fused at
+        all: every patch on them stays in its LoRA's set, in stack order, so
+        the result matches applying the LoRAs one by one.
+    """
+    unet_map = comfy.lora.model_lora_keys_unet(model.model, {}) if model is not None else {}
+    clip_map = comfy.lora.model_lora_keys_clip(clip.cond_stage_model, {}) if clip is not None else {}
+    key_map = {**unet_map, **clip_map}
+    unet_targets = set(unet_map.values())
+    clip_targets = set(clip_map.values())
+
+    lowrank: Dict[str, Dict] = {"model": {}, "clip": {}}
+    per_lora: List[Tuple[Dict, Dict, Dict]] = []  # (unfused, plain low-rank, strength) per target
+    ordered_keys = set()
+
+    for lora_sd, strength_model, strength_clip in stack:
+        loaded = comfy.lora.load_lora(convert_lora(lora_sd), key_map)
+        unfused = {"model": {}, "clip": {}}
+        plain = {"model": {}, "clip": {}}
+
+        for key, patch in loaded.items():
+            if key in unet_targets:
+                target, strength = "model", strength_model
+            elif key in clip_targets:
+                target, strength = "clip", strength_clip
+            else:
+                continue
+            if strength == 0:
+                continue
+
+            weights = _lowrank_weights(patch)
+            if weights is None:
+                unfused[target][key] = patch
+                if _is_order_dependent(patch):
+                    ordered_keys.add(key)
+                continue
+            up, down, alpha = weights
+            scale = strength * (alpha / down.shape[0] if alpha is not None else 1.0)
+            lowrank[target].setdefault(key, []).append((up, down, scale, patch, strength))
+            plain[target][key] = patch
+
+        per_lora.append((unfused, plain, {"model": strength_model, "clip": strength_clip}))
+
+    leftovers: List[Tuple[str, Dict, float]] = []
+    for unfused, plain, strengths in per_lora:
+        for target in ("model", "clip"):
+            # Low-rank patches on order-dependent keys keep their place instead of being fused
+            patches = {**unfused[target], **{key: patch for key, patch in plain[target].items() if key in ordered_keys}}
+            if patches:
+                leftovers.append((target, patches, strengths[target]))
+
+    patch_sets = []
+    for target, per_key in lowrank.items():
+        fused = {}
+        for key, parts in per_key.items():
+            if key in ordered_keys:
+                continue
+            patch = _fuse_parts(parts)
+            if patch is not None:
+                fused[key] = patch
+                continue
+            # Mismatched factor shapes, keep each contribution as its own patch
+            for _, _, _, original, strength in parts:
+                leftovers.append((target, {key: original}, strength))
+        if fused:
+            patch_sets.append((target, fused, 1.0))
+
+    return patch_sets + leftovers
+
+
+def apply_patch_sets(model, clip, patch_sets: List[Tuple[str, Dict, float]]) -> tuple:
+    """Clone model/clip and add the given patch sets, like comfy.sd.load_lora_for_models."""
+    new_model = model.clone() if model is not None else None
+    new_clip = clip.clone() if clip is not None else None
+    for target, patches, strength in patch_sets:
+        if target == "model" and new_model is not None:
+            new_model.add_patches(patches, strength)
+        elif target == "clip" and new_clip is not None:
+            new_clip.add_patches(patches, strength)
+    return (new_model, new_clip)
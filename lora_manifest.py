@@ -0,0 +1,295 @@
+"""
+SQLite-backed manifest of downloaded and partially downloaded LoRA files.
+"""
+import os
+import json
+import sqlite3
+import threading
+from typing import Optional, Dict, List, Tuple
+
+# How long a process waits for another one's write lock before giving up
+BUSY_TIMEOUT_MS = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    version_id INTEGER PRIMARY KEY,
+    file_name TEXT NOT NULL,
+    original_name TEXT NOT NULL DEFAULT '',
+    size INTEGER NOT NULL DEFAULT 0,
+    mtime_ns INTEGER NOT NULL DEFAULT 0,
+    sha256 TEXT NOT NULL DEFAULT '',
+    verified INTEGER NOT NULL DEFAULT 0,
+    pinned INTEGER NOT NULL DEFAULT 0,
+    last_access REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS files_by_access ON files (pinned, last_access);
+CREATE INDEX IF NOT EXISTS files_by_sha256 ON files (sha256);
+
+CREATE TABLE IF NOT EXISTS partials (
+    version_id INTEGER PRIMARY KEY,
+    file_name TEXT NOT NULL,
+    original_name TEXT NOT NULL DEFAULT '',
+    downloaded INTEGER NOT NULL DEFAULT 0,
+    total_size INTEGER NOT NULL DEFAULT 0,
+    segments TEXT
+);
+
+-- Which process is downloading a version, refreshed by a heartbeat
+CREATE TABLE IF NOT EXISTS claims (
+    version_id INTEGER PRIMARY KEY,
+    owner TEXT NOT NULL,
+    heartbeat REAL NOT NULL
+);
+
+-- Single-row aggregates kept current by triggers, so stats never scan files
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    file_count INTEGER NOT NULL,
+    total_bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO totals (id, file_count, total_bytes) VALUES (0, 0, 0);
+
+CREATE TRIGGER IF NOT EXISTS files_insert AFTER INSERT ON files BEGIN
+    UPDATE totals SET file_count = file_count + 1, total_bytes = total_bytes + NEW.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS files_delete AFTER DELETE ON files BEGIN
+    UPDATE totals SET file_count = file_count - 1, total_bytes = total_bytes - OLD.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS files_resize AFTER UPDATE OF size ON files BEGIN
+    UPDATE totals SET total_bytes = total_bytes - OLD.size + NEW.size WHERE id = 0;
+END;
+"""
+
+_FILE_COLUMNS = ("version_id", "file_name", "original_name", "size", "mtime_ns",
+                 "sha256", "verified", "pinned", "last_access")
+
+
+class ManifestStore:
+    """
+    Indexed store of the files LoRACacheManager manages.
+
+    Each file row records size, mtime, SHA256, pin state and last access.
+    Every change is a single-row statement instead of a rewrite of the
+    whole manifest, and file count and total size come from an aggregate
+    row that triggers keep up to date.
+
+    Several ComfyUI processes may share one store: the database runs in
+    WAL mode so readers never block, writers wait up to BUSY_TIMEOUT_MS
+    for each other, and nothing is cached in memory, so every lookup sees
+    the other processes' changes.
+    """
+
+    def __init__(self, db_path: str, legacy_json: Optional[str] = None):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(SCHEMA)
+        if legacy_json and os.path.exists(legacy_json):
+            self._migrate_json(legacy_json)
+
+    def _migrate_json(self, path: str):
+        """Import a manifest.json from older versions, then set it aside."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except Exception as e:
+            print(f"[SEngine] Error reading legacy manifest: {e}")
+            return
+
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            for str_id, info in legacy.get("files", {}).items():
+                # Old entries stored an absolute local_path, which joins back unchanged
+                file_name = info.get("file_name") or info.get("local_path", "")
+                if not file_name:
+                    continue
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO files (version_id, file_name, original_name, size, sha256,"
+                    " verified, pinned, last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (int(str_id), file_name, info.get("original_name", ""), info.get("size", 0),
+                     info.get("sha256", ""), int(bool(info.get("verified"))),
+                     int(bool(info.get("pinned"))), info.get("last_access", 0))
+                )
+            for str_id, info in legacy.get("partial", {}).items():
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO partials (version_id, file_name, original_name, downloaded,"
+                    " total_size, segments) VALUES (?, ?, ?, ?, ?, ?)",
+                    (int(str_id), info.get("file_name", ""), info.get("original_name", ""),
+                     info.get("downloaded", 0), info.get("total_size", 0),
+                     json.dumps(info["segments"]) if info.get("segments") else None)
+                )
+        try:
+            os.replace(path, path + ".migrated")
+        except OSError as e:
+            print(f"[SEngine] Could not rename legacy manifest: {e}")
+        print(f"[SEngine] Migrated {len(legacy.get('files', {}))} manifest entries to {os.path.basename(self.db_path)}")
+
+    def _query(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _execute(self, sql: str, params: tuple = ()) -> int:
+        """Run one statement and return the number of rows it changed."""
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    # ------------------------------------------------------------------
+    # Files
+    # ------------------------------------------------------------------
+
+    def get_file(self, version_id: int) -> Optional[Dict]:
+        rows = self._query("SELECT * FROM files WHERE version_id = ?", (version_id,))
+        return dict(rows[0]) if rows else None
+
+    def all_files(self) -> List[Dict]:
+        return [dict(row) for row in self._query("SELECT * FROM files")]
+
+    def put_file(self, version_id: int, **fields):
+        """Insert or replace the row of a completed download."""
+        row = {column: fields[column] for column in _FILE_COLUMNS[1:] if column in fields}
+        row["verified"] = int(bool(row.get("verified")))
+        row["pinned"] = int(bool(row.get("pinned")))
+        columns = ["version_id"] + list(row)
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            # Delete + insert rather than REPLACE so the aggregate triggers fire
+            self._conn.execute("DELETE FROM files WHERE version_id = ?", (version_id,))
+            self._conn.execute(
+                f"INSERT INTO files ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                (version_id, *row.values())
+            )
+
+    def remove_file(self, version_id: int) -> Optional[Dict]:
+        """Delete a file row and return it."""
+        with self._lock:
+            info = self.get_file(version_id)
+            if info is not None:
+                self._execute("DELETE FROM files WHERE version_id = ?", (version_id,))
+            return info
+
+    def touch(self, version_id: int, when: float, min_interval: float = 0.0):
+        """Set last_access, skipping the write if the stored value is less than min_interval old."""
+        self._execute(
+            "UPDATE files SET last_access = ? WHERE version_id = ? AND last_access <= ?",
+            (when, version_id, when - min_interval)
+        )
+
+    def set_pinned(self, version_id: int, pinned: bool) -> bool:
+        return self._execute(
+            "UPDATE files SET pinned = ? WHERE version_id = ?", (int(pinned), version_id)
+        ) > 0
+
+    def update_stat(self, version_id: int, size: int, mtime_ns: int, rehash: bool = False):
+        """Record the on-disk size and mtime; rehash clears a hash that no longer applies."""
+        if rehash:
+            self._execute(
+                "UPDATE files SET size = ?, mtime_ns = ?, sha256 = '', verified = 0 WHERE version_id = ?",
+                (size, mtime_ns, version_id)
+            )
+        else:
+            self._execute(
+                "UPDATE files SET size = ?, mtime_ns = ? WHERE version_id = ?", (size, mtime_ns, version_id)
+            )
+
+    def find_by_sha256(self, sha256: str) -> List[Dict]:
+        """Files whose recorded content hash is sha256 (served by the hash index)."""
+        return [dict(row) for row in self._query("SELECT * FROM files WHERE sha256 = ?", (sha256.lower(),))]
+
+    def eviction_order(self) -> List[Dict]:
+        """Unpinned files, least recently used first (served by the access index)."""
+        return [dict(row) for row in self._query(
+            "SELECT version_id, file_name, size, sha256, last_access FROM files WHERE pinned = 0 ORDER BY last_access"
+        )]
+
+    def totals(self) -> Tuple[int, int]:
+        """(file count, total bytes) from the maintained aggregate."""
+        row = self._query("SELECT file_count, total_bytes FROM totals WHERE id = 0")[0]
+        return row["file_count"], row["total_bytes"]
+
+    def shared_bytes(self) -> int:
+        """Bytes totals() counts more than once because several files share content (same sha256)."""
+        row = self._query(
+            "SELECT COALESCE(SUM(size * (copies - 1)), 0) AS shared FROM ("
+            " SELECT MAX(size) AS size, COUNT(*) AS copies FROM files WHERE sha256 != ''"
+            " GROUP BY sha256 HAVING COUNT(*) > 1)"
+        )[0]
+        return row["shared"]
+
+    # ------------------------------------------------------------------
+    # Partial downloads
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _partial_dict(row: sqlite3.Row) -> Dict:
+        info = dict(row)
+        segments = info.pop("segments")
+        if segments:
+            info["segments"] = json.loads(segments)
+        return info
+
+    def get_partial(self, version_id: int) -> Optional[Dict]:
+        rows = self._query("SELECT * FROM partials WHERE version_id = ?", (version_id,))
+        return self._partial_dict(rows[0]) if rows else None
+
+    def all_partials(self) -> List[Dict]:
+        return [self._partial_dict(row) for row in self._query("SELECT * FROM partials")]
+
+    def set_partial(self, version_id: int, file_name: str, original_name: str,
+                    downloaded: int, total_size: int, segments: Optional[List[List[int]]] = None):
+        self._execute(
+            "INSERT OR REPLACE INTO partials (version_id, file_name, original_name, downloaded, total_size, segments)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (version_id, file_name, original_name, downloaded, total_size,
+             json.dumps(segments) if segments else None)
+        )
+
+    def pop_partial(self, version_id: int) -> Optional[Dict]:
+        with self._lock:
+            info = self.get_partial(version_id)
+            if info is not None:
+                self._execute("DELETE FROM partials WHERE version_id = ?", (version_id,))
+            return info
+
+    # ------------------------------------------------------------------
+    # Cross-process download claims
+    # ------------------------------------------------------------------
+
+    def claim(self, version_id: int, owner: str, now: float, ttl: float) -> Optional[str]:
+        """
+        Claim the download of version_id for owner.
+
+        A claim whose heartbeat is older than ttl is taken over.
+
+        Returns:
+            None if owner now holds the claim, otherwise the current holder
+        """
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute(
+                "SELECT owner, heartbeat FROM claims WHERE version_id = ?", (version_id,)
+            ).fetchone()
+            if row is not None and row["owner"] != owner and now - row["heartbeat"] < ttl:
+                return row["owner"]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO claims (version_id, owner, heartbeat) VALUES (?, ?, ?)",
+                (version_id, owner, now)
+            )
+            return None
+
+    def refresh_claims(self, owner: str, now: float):
+        """Heartbeat all claims held by owner."""
+        self._execute("UPDATE claims SET heartbeat = ? WHERE owner = ?", (now, owner))
+
+    def release_claim(self, version_id: int, owner: str):
+        self._execute("DELETE FROM claims WHERE version_id = ? AND owner = ?", (version_id, owner))
+
+    def clear(self):
+        """Forget all files and partial downloads."""
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DELETE FROM files")
+            self._conn.execute("DELETE FROM partials")
@@ -0,0 +1,255 @@
+"""
+Predictive prefetch of LoRAs from usage history and sidebar hints.
+"""
+import os
+import json
+import time
+import asyncio
+import threading
+from typing import Optional, Dict, List
+
+from .cache_io import atomic_write_json, FileLock
+from .lora_cache import get_cache_manager, PRIORITY_PREFETCH
+
+# Disk space prefetched-but-unused LoRAs may take (override with SENGINE_PREFETCH_BUDGET_MB, 0 disables)
+PREFETCH_BUDGET = int(float(os.environ.get("SENGINE_PREFETCH_BUDGET_MB", "2048")) * 1024 * 1024)
+
+# Days after which a past use counts half as much
+USAGE_HALF_LIFE_DAYS = 7.0
+
+# Score a LoRA needs before it is prefetched (one use today scores 1.0)
+MIN_PREFETCH_SCORE = 0.5
+
+# Score added for hints from the sidebar
+HINT_WEIGHTS = {
+    "selection": 4.0,  # Selected on the node, about to be run
+    "saved": 1.0,      # Part of a saved configuration
+}
+
+
+class LoRAPrefetcher:
+    """
+    Downloads LoRAs that are likely to be needed next, at prefetch priority.
+
+    Each LoRA is scored from how often and how recently the loader node used
+    it, plus the hints the sidebar sends (current selection, saved
+    configurations). The best-scoring ones that are not on disk yet are
+    downloaded one at a time while the space taken by prefetched LoRAs
+    that were never used stays within PREFETCH_BUDGET.
+    """
+
+    def __init__(self, cache_manager=None, cache_dir: str = None):
+        self.cache_manager = cache_manager or get_cache_manager()
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(__file__), "cache")
+        os.makedirs(cache_dir, exist_ok=True)
+        self.usage_file = os.path.join(cache_dir, "usage.json")
+
+        self._lock = threading.Lock()
+        self._usage_mtime = None
+        self._usage: Dict[str, Dict] = {}
+        self._refresh_usage()
+        self._hints: Dict[str, Dict] = {}
+        self._failed = set()
+        self._api_key = ""
+        self._task: Optional[asyncio.Future] = None
+        self._stats = {"downloaded": 0, "hits": 0}
+        self._pending = 0  # Candidates left at the last prefetch pass, so routes never scan
+
+    def _load_usage(self) -> Dict[str, Dict]:
+        """Load usage history from disk."""
+        if os.path.exists(self.usage_file):
+            try:
+                with open(self.usage_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"[SEngine] Error loading usage history: {e}")
+        return {}
+
+    def _refresh_usage(self):
+        """Re-read usage history if it changed on disk (e.g. written by another process)."""
+        try:
+            mtime = os.stat(self.usage_file).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._usage_mtime:
+            usage = self._load_usage()
+            with self._lock:
+                self._usage, self._usage_mtime = usage, mtime
+
+    def _update_usage(self, update):
+        """Apply update(usage) as a read-modify-write locked against other processes."""
+        try:
+            with FileLock(self.usage_file + ".lock"):
+                self._refresh_usage()
+                with self._lock:
+                    update(self._usage)
+                    atomic_write_json(self.usage_file, self._usage)
+                    self._usage_mtime = os.stat(self.usage_file).st_mtime_ns
+        except Exception as e:
+            print(f"[SEngine] Error saving usage history: {e}")
+
+    @staticmethod
+    def _file_fields(entry: Dict) -> Dict:
+        """What is needed to download a LoRA later."""
+        return {
+            "file_name": entry.get("file_name", ""),
+            "download_url": entry.get("download_url", ""),
+            "sha256": entry.get("sha256", ""),
+            "file_size_kb": entry.get("file_size_kb", 0) or 0,
+        }
+
+    def record_usage(self, entries: List[Dict]):
+        """Count a run of the loader node for each LoRA in entries."""
+        now = time.time()
+
+        def update(usage):
+            for entry in entries:
+                record = usage.setdefault(str(entry["version_id"]), {"count": 0})
+                record["count"] = record.get("count", 0) + 1
+                record["last_used"] = now
+                for key, value in self._file_fields(entry).items():
+                    if value:
+                        record[key] = value
+                if record.pop("prefetched", False):
+                    self._stats["hits"] += 1
+                    print(f"[SEngine] Prefetch hit: {entry.get('name') or entry['version_id']}")
+        self._update_usage(update)
+
+    def set_hints(self, selection: List[Dict], saved: List[Dict]):
+        """Replace the sidebar hints with its current selection and saved configurations."""
+        hints = {}
+        for source, entries in (("saved", saved), ("selection", selection)):
+            for entry in entries or []:
+                try:
+                    version_id = str(int(entry["version_id"]))
+                except (KeyError, TypeError, ValueError):
+                    continue
+                hint = hints.setdefault(version_id, {"weight": 0.0})
+                hint["weight"] += HINT_WEIGHTS[source]
+                for key, value in self._file_fields(entry).items():
+                    if value:
+                        hint[key] = value
+        with self._lock:
+            self._hints = hints
+
+    def _score(self, version_id: str, now: float) -> float:
+        score = self._hints.get(version_id, {}).get("weight", 0.0)
+        record = self._usage.get(version_id)
+        if record and record.get("last_used"):
+            age_days = max(now - record["last_used"], 0) / 86400
+            score += record.get("count", 0) * 0.5 ** (age_days / USAGE_HALF_LIFE_DAYS)
+        return score
+
+    def _prefetched_bytes(self) -> int:
+        """Disk space taken by prefetched LoRAs that have not been used yet."""
+        with self._lock:
+            prefetched = [version_id for version_id, record in self._usage.items() if record.get("prefetched")]
+        return sum(self.cache_manager.get_file_size(int(version_id)) for version_id in prefetched)
+
+    def get_candidates(self) -> List[Dict]:
+        """LoRAs worth prefetching, best first, as download entries with their score."""
+        self._refresh_usage()
+        now = time.time()
+        with self._lock:
+            version_ids = set(self._hints) | set(self._usage)
+            candidates = []
+            for version_id in version_ids:
+                if version_id in self._failed or self.cache_manager.is_downloaded(int(version_id)):
+                    continue
+                score = self._score(version_id, now)
+                if score < MIN_PREFETCH_SCORE:
+                    continue
+                entry = {**self._usage.get(version_id, {}), **self._hints.get(version_id, {})}
+                if not entry.get("file_name"):
+                    continue
+                candidates.append({"version_id": int(version_id), "score": score, **self._file_fields(entry)})
+        candidates.sort(key=lambda c: c["score"], reverse=True)
+        return candidates
+
+    @property
+    def pending(self) -> int:
+        """Number of LoRAs worth prefetching as of the last prefetch pass."""
+        return self._pending
+
+    def _next_candidate(self, attempted) -> Optional[Dict]:
+        """Best candidate that fits the budgets (runs in an executor: stats files, reads usage)."""
+        used = self._prefetched_bytes()
+        # Prefetching never makes the disk cache evict anything
+        headroom = self.cache_manager.get_disk_headroom()
+        candidates = self.get_candidates()
+        self._pending = len(candidates)
+        for candidate in candidates:
+            size = candidate["file_size_kb"] * 1024
+            if candidate["version_id"] in attempted or used + size > PREFETCH_BUDGET:
+                continue
+            if headroom is not None and (headroom <= 0 or size > headroom):
+                continue
+            return candidate
+        return None
+
+    def start(self, api_key: str = ""):
+        """Start prefetching in the background on the running loop, unless it already is."""
+        if api_key:
+            self._api_key = api_key
+        if PREFETCH_BUDGET <= 0 or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        # Scanning candidates stats files and updating usage waits on another process's
+        # lock and fsyncs, neither belongs on the server loop
+        loop = asyncio.get_running_loop()
+        attempted = set()
+        while True:
+            candidate = await loop.run_in_executor(None, self._next_candidate, attempted)
+            if candidate is None:
+                return
+            version_id = candidate["version_id"]
+            attempted.add(version_id)
+            print(f"[SEngine] Prefetching version {version_id} (score {candidate['score']:.2f})")
+            try:
+                success, result = await self.cache_manager.download_lora(
+                    version_id, candidate["file_name"], self._api_key,
+                    download_url=candidate["download_url"],
+                    expected_sha256=candidate["sha256"],
+                    priority=PRIORITY_PREFETCH
+                )
+            except Exception as e:
+                success, result = False, str(e)
+
+            if not success:
+                print(f"[SEngine] Prefetch of version {version_id} failed: {result}")
+                self._failed.add(str(version_id))
+                continue
+
+            def mark_prefetched(usage, candidate=candidate):
+                record = usage.setdefault(str(version_id), {"count": 0})
+                record.update({k: v for k, v in self._file_fields(candidate).items() if v})
+                # Unused until the node loads it, counts against the budget meanwhile
+                record["prefetched"] = True
+            await loop.run_in_executor(None, self._update_usage, mark_prefetched)
+            self._stats["downloaded"] += 1
+
+    def info(self) -> Dict:
+        """Prefetch state for the cache info route."""
+        return {
+            "enabled": PREFETCH_BUDGET > 0,
+            "budget_bytes": PREFETCH_BUDGET,
+            "prefetched_bytes": self._prefetched_bytes(),
+            "running": self._task is not None and not self._task.done(),
+            "pending": self.pending,
+            **self._stats,
+        }
+
+
+# Global instance
+_prefetcher: Optional[LoRAPrefetcher] = None
+
+
+def get_prefetcher() -> LoRAPrefetcher:
+    """Get or create the global prefetcher."""
+    global _prefetcher
+    if _prefetcher is None:
+        _prefetcher = LoRAPrefetcher()
+    return _prefetcher
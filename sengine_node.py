@@ -1,13 +1,57 @@
 """
 SEngine LoRA Loader Node
 """
+import os
 import json
-
+import mmap
+import hashlib
+import weakref
+import struct
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import torch
 import comfy.sd
 import comfy.utils
 from server import PromptServer
 
-from .lora_cache import get_cache_manager
+from .lora_cache import get_cache_manager, PRIORITY_BLOCKING
+from .lora_fusion import fuse_lora_stack, apply_patch_sets
+from .lora_prefetch import get_prefetcher
+
+# Byte budget for LoRA weights kept in memory (override with SENGINE_LORA_MEMORY_MB)
+LORA_MEMORY_BUDGET = int(float(os.environ.get("SENGINE_LORA_MEMORY_MB", "4096")) * 1024 * 1024)
+
+# Missing LoRAs downloaded in parallel before a stack is applied (override with SENGINE_DOWNLOAD_CONCURRENCY)
+DOWNLOAD_CONCURRENCY = max(1, int(os.environ.get("SENGINE_DOWNLOAD_CONCURRENCY", "3")))
+
+# Fold all LoRAs of a stack into one patch set by default (override per node with "fuse" in sengine_data)
+LORA_FUSE_DEFAULT = os.environ.get("SENGINE_FUSE_LORAS", "0") == "1"
+
+# Load .safetensors LoRAs as zero-copy views into a memory map (override with SENGINE_LORA_MMAP=0/1).
+# Off by default on Windows, where a mapped file cannot be deleted or replaced.
+LORA_MMAP = os.environ.get("SENGINE_LORA_MMAP", "0" if os.name == "nt" else "1") == "1"
+
+# Number of patched (MODEL, CLIP) results kept for repeat runs (override with SENGINE_PATCHED_CACHE_SIZE)
+PATCHED_CACHE_SIZE = int(os.environ.get("SENGINE_PATCHED_CACHE_SIZE", "2"))
+
+_SAFETENSORS_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+}
+if hasattr(torch, "float8_e4m3fn"):
+    _SAFETENSORS_DTYPES["F8_E4M3"] = torch.float8_e4m3fn
+    _SAFETENSORS_DTYPES["F8_E5M2"] = torch.float8_e5m2
 
 
 def send_progress(version_id, progress, status="downloading", name=""):
@@ -23,26 +67,442 @@ def send_progress(version_id, progress, status="downloading", name=""):
         pass
 
 
+def _state_dict_nbytes(state_dict: Dict) -> int:
+    """Total size in bytes of the tensors in a state dict."""
+    total = 0
+    for tensor in state_dict.values():
+        if hasattr(tensor, "element_size") and hasattr(tensor, "nelement"):
+            total += tensor.element_size() * tensor.nelement()
+    return total
+
+
+def _load_safetensors_mmap(path: str) -> Dict:
+    """
+    Load a .safetensors file as tensors that view a private memory map of it.
+
+    No tensor data is read here: pages are faulted in from the page cache
+    only when a tensor is first touched, and are shared with it until written.
+    """
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    if len(mm) < 8:
+        raise ValueError("Safetensors file has incomplete metadata")
+    header_len = struct.unpack("<Q", mm[:8])[0]
+    data_start = 8 + header_len
+    if data_start > len(mm):
+        raise ValueError("Safetensors file has incomplete metadata")
+    header = json.loads(mm[8:data_start])
+
+    state_dict = {}
+    for key, info in header.items():
+        if key == "__metadata__":
+            continue
+        dtype = _SAFETENSORS_DTYPES.get(info["dtype"])
+        if dtype is None:
+            raise ValueError(f"Unsupported safetensors dtype {info['dtype']} for {key}")
+        begin, end = info["data_offsets"]
+        begin += data_start
+        end += data_start
+        if end > len(mm):
+            raise ValueError(f"Safetensors data for {key} not fully covered by file")
+
+        itemsize = torch.empty(0, dtype=dtype).element_size()
+        count = (end - begin) // itemsize
+        if count == 0:
+            tensor = torch.empty(info["shape"], dtype=dtype)
+        elif begin % itemsize:
+            # Misaligned data cannot be viewed in place, copy just this tensor
+            tensor = torch.frombuffer(bytearray(mm[begin:end]), dtype=dtype)
+        else:
+            tensor = torch.frombuffer(mm, dtype=dtype, count=count, offset=begin)
+        state_dict[key] = tensor.reshape(info["shape"])
+    return state_dict
+
+
+def _load_lora_file(path: str) -> Dict:
+    """Load a LoRA state dict from disk, memory-mapped when enabled."""
+    if LORA_MMAP and path.lower().endswith(".safetensors"):
+        return _load_safetensors_mmap(path)
+    return comfy.utils.load_torch_file(path, safe_load=True)
+
+
+class LoraWeightCache:
+    """
+    LRU cache of loaded LoRA state dicts, bounded by total tensor bytes.
+
+    Each entry remembers the file's on-disk identity when it was loaded, so
+    a file replaced in place under the same path is read again.
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # path -> (state_dict, nbytes, identity)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._entries
+
+    def get(self, path: str, identity=None) -> Optional[Dict]:
+        """Return the cached state dict for a path (loaded from a file of this identity) and mark it most recently used."""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[2] != identity:
+                # The file changed on disk since it was loaded
+                del self._entries[path]
+                self._total_bytes -= entry[1]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(path)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, path: str, state_dict: Dict, identity=None):
+        """Insert a state dict, evicting least recently used entries to stay within budget."""
+        nbytes = _state_dict_nbytes(state_dict)
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self._total_bytes -= old[1]
+            self._entries[path] = (state_dict, nbytes, identity)
+            self._total_bytes += nbytes
+            # Never evict the entry just inserted, it is about to be used
+            while self._total_bytes > self.budget_bytes and len(self._entries) > 1:
+                evicted_path, (_, evicted_bytes, _) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_bytes
+                self.evictions += 1
+                print(f"[SEngine] Evicted from memory: {evicted_path} ({evicted_bytes / (1024*1024):.1f} MB)")
+
+    def discard(self, path: str) -> bool:
+        """Drop the entry for one path, e.g. after its file was deleted."""
+        with self._lock:
+            entry = self._entries.pop(path, None)
+            if entry is None:
+                return False
+            self._total_bytes -= entry[1]
+            return True
+
+    def clear(self) -> int:
+        """Drop all entries and return how many were removed."""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._total_bytes = 0
+            return count
+
+    def info(self) -> Dict:
+        """Snapshot of cache contents and counters."""
+        with self._lock:
+            entries = [{"path": path, "bytes": nbytes} for path, (_, nbytes, _) in self._entries.items()]
+            return {
+                "count": len(entries),
+                "paths": [e["path"] for e in entries],
+                "entries": entries,
+                "total_bytes": self._total_bytes,
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def _weak_or_none(obj, callback=None):
+    """Weak reference to obj, or None if obj is None or not weak-referenceable."""
+    if obj is None:
+        return None
+    try:
+        return weakref.ref(obj, callback)
+    except TypeError:
+        return None
+
+
+class PatchedModelCache:
+    """
+    Small LRU of patched (MODEL, CLIP) results.
+
+    Entries are keyed by the identity of the input model/clip plus a digest of
+    the LoRA stack. Inputs are held weakly and compared on lookup, so a reused
+    id() of a freed model never produces a false hit. The cached clones share
+    the inputs' diffusion model and text encoder, so an entry is dropped as
+    soon as one of its inputs is freed (e.g. after a checkpoint switch) rather
+    than keeping the old weights alive until it ages out.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (model_ref, clip_ref, result)
+        # Reentrant: dropping an entry can free an input and run _evict on this thread
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model, clip, digest: str) -> Optional[tuple]:
+        """Return the cached (MODEL, CLIP) for these inputs and stack, if any."""
+        key = (id(model), id(clip), digest)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                model_ref, clip_ref, result = entry
+                clip_alive = clip is None or (clip_ref is not None and clip_ref() is clip)
+                if model_ref() is model and clip_alive:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, model, clip, digest: str, result: tuple):
+        """Store a patched result, dropping the least recently used beyond max_entries."""
+        if self.max_entries <= 0:
+            return
+        key = (id(model), id(clip), digest)
+        evict = lambda ref: self._evict(key, ref)
+        model_ref = _weak_or_none(model, evict)
+        clip_ref = _weak_or_none(clip, evict)
+        if model_ref is None or (clip is not None and clip_ref is None):
+            return
+        with self._lock:
+            self._entries[key] = (model_ref, clip_ref, result)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _evict(self, key: tuple, ref: weakref.ref):
+        """Weakref callback: an input of the entry was freed, release its patched clones."""
+        with self._lock:
+            entry = self._entries.get(key)
+            # The key may already hold a newer entry for a model that reused the id
+            if entry is not None and (entry[0] is ref or entry[1] is ref):
+                del self._entries[key]
+
+    def clear(self) -> int:
+        """Drop all entries and return how many were removed."""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            return count
+
+    def info(self) -> Dict:
+        """Snapshot of cache size and counters."""
+        with self._lock:
+            return {
+                "count": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
 # Module-level cache for loaded LoRA weights (persists across node instances)
-_lora_cache = {}
+_lora_cache = LoraWeightCache(LORA_MEMORY_BUDGET)
+
+# Module-level cache of patched model/clip clones for unchanged stacks
+_patched_cache = PatchedModelCache(PATCHED_CACHE_SIZE)
+
+# Module-level cache of fused patch sets, keyed by stack digest and model architecture
+_fused_cache: "OrderedDict[tuple, list]" = OrderedDict()
 
 
 def clear_lora_cache():
     """Clear the LoRA weight cache to free memory."""
-    global _lora_cache
-    count = len(_lora_cache)
-    _lora_cache.clear()
+    count = _lora_cache.clear()
+    _patched_cache.clear()
+    _fused_cache.clear()
     print(f"[SEngine] Cleared {count} LoRA(s) from cache")
     return count
 
 
+def _on_lora_file_removed(version_id: int, local_path: Optional[str]):
+    """Drop the in-memory weights of a LoRA whose file left the disk cache."""
+    if local_path and _lora_cache.discard(local_path):
+        print(f"[SEngine] Dropped weights of removed file from memory: {local_path}")
+
+
+get_cache_manager().add_eviction_listener(_on_lora_file_removed)
+
+
 def get_lora_cache_info():
     """Get info about cached LoRAs."""
-    global _lora_cache
-    return {
-        "count": len(_lora_cache),
-        "paths": list(_lora_cache.keys())
-    }
+    info = _lora_cache.info()
+    info["patched_models"] = _patched_cache.info()
+    info["fused_stacks"] = len(_fused_cache)
+    return info
+
+
+def _normalize_loras(lora_list: List, overall_strength: float, verbose: bool = True) -> List[Dict]:
+    """Validate LoRA entries and resolve their effective strengths, dropping disabled ones."""
+    entries = []
+    for i, lora_info in enumerate(lora_list):
+        if not isinstance(lora_info, dict):
+            if verbose:
+                print(f"[SEngine] Invalid lora entry {i}")
+            continue
+
+        version_id = lora_info.get("version_id")
+        if not version_id:
+            continue
+
+        strength = float(lora_info.get("strength", 1.0))
+        strength_clip = float(lora_info.get("strength_clip", strength))
+        name = lora_info.get("name", "Unknown")
+
+        # Apply overall strength multiplier
+        strength = strength * overall_strength
+        strength_clip = strength_clip * overall_strength
+
+        if strength == 0 and strength_clip == 0:
+            if verbose:
+                print(f"[SEngine] Skipping {name} (effective strength=0)")
+            continue
+
+        entries.append({
+            "version_id": version_id,
+            "name": name,
+            "file_name": lora_info.get("file_name", f"{version_id}.safetensors"),
+            "download_url": lora_info.get("download_url", ""),
+            "sha256": lora_info.get("sha256", ""),
+            "strength": strength,
+            "strength_clip": strength_clip,
+        })
+    return entries
+
+
+def _download_lora(entry: Dict, api_key: str, cache_manager) -> Optional[str]:
+    """Download one LoRA, reporting progress to the sidebar. Returns the local path or None."""
+    version_id = entry["version_id"]
+    name = entry["name"]
+
+    print(f"[SEngine] Downloading: {name} (version {version_id})")
+    send_progress(version_id, 0, "downloading", name)
+
+    # Throttle progress updates - only send every 5%
+    last_reported = [0]
+    def progress_cb(vid, prog):
+        if prog - last_reported[0] >= 0.05 or prog >= 1.0:
+            last_reported[0] = prog
+            send_progress(vid, prog, "downloading", name)
+
+    try:
+        success, result = cache_manager.download_lora_sync(
+            version_id, entry["file_name"], api_key,
+            progress_callback=progress_cb,
+            download_url=entry["download_url"],
+            expected_sha256=entry["sha256"],
+            priority=PRIORITY_BLOCKING
+        )
+    except Exception as e:
+        success, result = False, str(e)
+
+    if not success:
+        print(f"[SEngine] Download failed: {result}")
+        send_progress(version_id, 0, "failed", name)
+        return None
+    send_progress(version_id, 1, "complete", name)
+    print(f"[SEngine] Downloaded to: {result}")
+    return result
+
+
+def _resolve_local_paths(entries: List[Dict], api_key: str, cache_manager) -> Dict:
+    """
+    Map each version_id in the stack to its local file, fetching all missing
+    ones concurrently (up to DOWNLOAD_CONCURRENCY at a time).
+
+    Returns:
+        Dict of version_id -> local path, or None where the download failed
+    """
+    paths = {}
+    missing = {}
+    for entry in entries:
+        version_id = entry["version_id"]
+        if version_id in paths or version_id in missing:
+            continue
+        local_path = cache_manager.get_local_path(version_id)
+        if local_path:
+            paths[version_id] = local_path
+        else:
+            missing[version_id] = entry
+
+    if not missing:
+        return paths
+
+    print(f"[SEngine] Downloading {len(missing)} missing LoRA(s), {min(DOWNLOAD_CONCURRENCY, len(missing))} at a time")
+    with ThreadPoolExecutor(max_workers=min(DOWNLOAD_CONCURRENCY, len(missing)), thread_name_prefix="sengine-dl") as pool:
+        futures = {
+            version_id: pool.submit(_download_lora, entry, api_key, cache_manager)
+            for version_id, entry in missing.items()
+        }
+        for version_id, future in futures.items():
+            paths[version_id] = future.result()
+    return paths
+
+
+def _file_identity(path: str) -> Optional[List[int]]:
+    """On-disk identity of a file as [size, mtime_ns], or None if it is missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _stack_digest(entries: List[Dict], fuse: bool = False) -> str:
+    """Canonical hash of a normalized LoRA stack: order, versions, strengths, files and fuse mode."""
+    canonical = [
+        [
+            str(e["version_id"]),
+            round(e["strength"], 6),
+            round(e["strength_clip"], 6),
+            _file_identity(e["local_path"]) if e.get("local_path") else None,
+        ]
+        for e in entries
+    ]
+    payload = {"fuse": bool(fuse), "loras": canonical}
+    return hashlib.sha256(json.dumps(payload, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def _model_signature(model, clip) -> tuple:
+    """Architecture of model/clip, which determines how LoRA keys map onto them."""
+    return (
+        type(model.model).__name__ if model is not None else None,
+        type(clip.cond_stage_model).__name__ if clip is not None else None,
+    )
+
+
+def _get_lora_weights(local_path: str, version_id, name: str, cache_manager) -> Dict:
+    """Get a LoRA state dict from the memory cache or disk, deleting corrupted files."""
+    # Stat before reading, so a replacement written during the load is caught next time
+    identity = _file_identity(local_path)
+    lora_sd = _lora_cache.get(local_path, identity)
+    if lora_sd is not None:
+        print(f"[SEngine] Using cached: {name}")
+        return lora_sd
+
+    print(f"[SEngine] Loading from disk: {local_path}")
+    try:
+        lora_sd = _load_lora_file(local_path)
+    except Exception as load_error:
+        # Check if it's a corrupted file error
+        error_str = str(load_error)
+        if "incomplete metadata" in error_str or "not fully covered" in error_str or "SafetensorError" in str(type(load_error)):
+            print(f"[SEngine] Corrupted file detected, deleting: {local_path}")
+            try:
+                # Remove from manifest too so it can be re-downloaded
+                cache_manager.remove_file(version_id)
+                print(f"[SEngine] Deleted corrupted file. Re-run workflow to re-download {name}")
+            except Exception as del_error:
+                print(f"[SEngine] Error deleting corrupted file: {del_error}")
+        raise
+    _lora_cache.put(local_path, lora_sd, identity)
+    return lora_sd
 
 
 class SEngineLoraLoader:
@@ -81,8 +541,33 @@ class SEngineLoraLoader:
     CATEGORY = "loaders"
 
     @classmethod
-    def IS_CHANGED(cls, **kwargs):
-        return float("nan")
+    def IS_CHANGED(cls, overall_strength=1.0, sengine_data="{}", **kwargs):
+        """
+        Digest of the effective LoRA stack and the on-disk identity of its files.
+
+        Cosmetic fields (names, preview URLs, API key) are ignored. While any
+        referenced LoRA is missing locally this returns NaN so the node always
+        re-runs and the download is retried.
+        """
+        try:
+            data = json.loads(sengine_data) if isinstance(sengine_data, str) and sengine_data.strip() else {}
+            lora_list = data.get("loras", []) if isinstance(data, dict) else []
+            if not isinstance(lora_list, list):
+                lora_list = []
+            entries = _normalize_loras(lora_list, float(overall_strength), verbose=False)
+            fuse = bool(data.get("fuse", LORA_FUSE_DEFAULT)) if isinstance(data, dict) else LORA_FUSE_DEFAULT
+        except (json.JSONDecodeError, TypeError, ValueError):
+            # apply_loras passes the inputs through unchanged for malformed data
+            return hashlib.sha256(str(sengine_data).encode("utf-8")).hexdigest()
+
+        cache_manager = get_cache_manager()
+        resolved = []
+        for entry in entries:
+            local_path = cache_manager.get_local_path(entry["version_id"])
+            if not local_path:
+                return float("nan")
+            resolved.append({**entry, "local_path": local_path})
+        return _stack_digest(resolved, fuse)
 
     def apply_loras(self, model, overall_strength=1.0, clip=None, sengine_data="{}"):
         """Apply selected LoRAs to the model and optionally clip."""
@@ -106,6 +591,7 @@ class SEngineLoraLoader:
 
         lora_list = data.get("loras", [])
         api_key = data.get("api_key", "")
+        fuse = bool(data.get("fuse", LORA_FUSE_DEFAULT))
 
         if not isinstance(lora_list, list):
             print(f"[SEngine] loras is not a list: {type(lora_list)}")
@@ -115,101 +601,116 @@ class SEngineLoraLoader:
             print("[SEngine] No LoRAs to apply")
             return (model, clip)
 
-        print(f"[SEngine] Applying {len(lora_list)} LoRA(s)")
+        entries = _normalize_loras(lora_list, overall_strength)
+        if not entries:
+            print("[SEngine] No LoRAs to apply")
+            return (model, clip)
 
-        cache_manager = get_cache_manager()
-        current_model = model
-        current_clip = clip
+        print(f"[SEngine] Applying {len(entries)} LoRA(s)")
 
-        for i, lora_info in enumerate(lora_list):
-            if not isinstance(lora_info, dict):
-                print(f"[SEngine] Invalid lora entry {i}")
-                continue
+        cache_manager = get_cache_manager()
 
-            version_id = lora_info.get("version_id")
-            strength = float(lora_info.get("strength", 1.0))
-            strength_clip = float(lora_info.get("strength_clip", strength))
-            file_name = lora_info.get("file_name", f"{version_id}.safetensors")
-            name = lora_info.get("name", "Unknown")
-            download_url = lora_info.get("download_url", "")
+        # Resolve local files, downloading all missing ones up front
+        local_paths = _resolve_local_paths(entries, api_key, cache_manager)
+        resolved = [
+            {**entry, "local_path": local_paths[entry["version_id"]]}
+            for entry in entries
+            if local_paths.get(entry["version_id"])
+        ]
 
-            if not version_id:
-                continue
+        # Usage history drives which LoRAs get prefetched
+        try:
+            get_prefetcher().record_usage(resolved)
+        except Exception as e:
+            print(f"[SEngine] Could not record LoRA usage: {e}")
+
+        # Reuse the patched clones from an identical earlier run
+        complete = len(resolved) == len(entries)
+        digest = _stack_digest(resolved, fuse) if complete else None
+        if digest:
+            cached = _patched_cache.get(model, clip, digest)
+            if cached is not None:
+                print(f"[SEngine] Using cached patched model for unchanged stack ({len(resolved)} LoRA(s))")
+                return cached
+
+        if fuse:
+            current_model, current_clip, all_applied = self._apply_fused(model, clip, resolved, digest, cache_manager)
+        else:
+            current_model, current_clip, all_applied = self._apply_sequential(model, clip, resolved, cache_manager)
+
+        # Only cache stacks that applied cleanly, so failures are retried next run
+        if digest and all_applied:
+            _patched_cache.put(model, clip, digest, (current_model, current_clip))
 
-            # Apply overall strength multiplier
-            strength = strength * overall_strength
-            strength_clip = strength_clip * overall_strength
+        return (current_model, current_clip)
 
-            if strength == 0 and strength_clip == 0:
-                print(f"[SEngine] Skipping {name} (effective strength=0)")
-                continue
+    def _apply_sequential(self, model, clip, resolved, cache_manager):
+        """Apply each LoRA as its own patch set, in order."""
+        current_model = model
+        current_clip = clip
+        all_applied = True
 
-            # Get local path or download
-            local_path = cache_manager.get_local_path(version_id)
-            if not local_path:
-                print(f"[SEngine] Downloading: {name} (version {version_id})")
-                send_progress(version_id, 0, "downloading", name)
-
-                # Throttle progress updates - only send every 5%
-                last_reported = [0]
-                def progress_cb(vid, prog):
-                    if prog - last_reported[0] >= 0.05 or prog >= 1.0:
-                        last_reported[0] = prog
-                        send_progress(vid, prog, "downloading", name)
-
-                success, result = cache_manager.download_lora_sync(
-                    version_id, file_name, api_key,
-                    progress_callback=progress_cb,
-                    download_url=download_url
-                )
-                if not success:
-                    print(f"[SEngine] Download failed: {result}")
-                    send_progress(version_id, 0, "failed", name)
-                    continue
-                local_path = result
-                send_progress(version_id, 1, "complete", name)
-                print(f"[SEngine] Downloaded to: {local_path}")
+        for entry in resolved:
+            name = entry["name"]
+            strength = entry["strength"]
+            strength_clip = entry["strength_clip"]
 
             # Load and apply
             try:
-                global _lora_cache
-                if local_path not in _lora_cache:
-                    print(f"[SEngine] Loading from disk: {local_path}")
-                    try:
-                        _lora_cache[local_path] = comfy.utils.load_torch_file(local_path, safe_load=True)
-                    except Exception as load_error:
-                        # Check if it's a corrupted file error
-                        error_str = str(load_error)
-                        if "incomplete metadata" in error_str or "not fully covered" in error_str or "SafetensorError" in str(type(load_error)):
-                            print(f"[SEngine] Corrupted file detected, deleting: {local_path}")
-                            import os
-                            try:
-                                os.remove(local_path)
-                                # Remove from manifest so it can be re-downloaded
-                                cache_manager._manifest.get("files", {}).pop(str(version_id), None)
-                                cache_manager._save_manifest()
-                                print(f"[SEngine] Deleted corrupted file. Re-run workflow to re-download {name}")
-                            except Exception as del_error:
-                                print(f"[SEngine] Error deleting corrupted file: {del_error}")
-                        raise
-                else:
-                    print(f"[SEngine] Using cached: {name}")
+                lora_sd = _get_lora_weights(entry["local_path"], entry["version_id"], name, cache_manager)
 
                 current_model, current_clip = comfy.sd.load_lora_for_models(
                     current_model,
                     current_clip,
-                    _lora_cache[local_path],
+                    lora_sd,
                     strength,
                     strength_clip
                 )
                 print(f"[SEngine] Applied: {name} (M:{strength:.2f} C:{strength_clip:.2f})")
 
             except Exception as e:
+                all_applied = False
                 print(f"[SEngine] Error applying {name}: {e}")
                 import traceback
                 traceback.print_exc()
 
-        return (current_model, current_clip)
+        return current_model, current_clip, all_applied
+
+    def _apply_fused(self, model, clip, resolved, digest, cache_manager):
+        """Fold the whole stack into one patch set per target and apply it once."""
+        all_applied = True
+        fuse_key = (digest, _model_signature(model, clip)) if digest else None
+        patch_sets = _fused_cache.pop(fuse_key, None) if fuse_key else None
+
+        if patch_sets is not None:
+            _fused_cache[fuse_key] = patch_sets  # Re-insert as most recently used
+            print("[SEngine] Using cached fused patch set")
+        else:
+            stack = []
+            for entry in resolved:
+                try:
+                    lora_sd = _get_lora_weights(entry["local_path"], entry["version_id"], entry["name"], cache_manager)
+                    stack.append((lora_sd, entry["strength"], entry["strength_clip"]))
+                except Exception as e:
+                    all_applied = False
+                    print(f"[SEngine] Error loading {entry['name']}: {e}")
+
+            try:
+                patch_sets = fuse_lora_stack(model, clip, stack)
+            except Exception as e:
+                print(f"[SEngine] Error fusing LoRA stack: {e}")
+                import traceback
+                traceback.print_exc()
+                return model, clip, False
+
+            if fuse_key and all_applied:
+                _fused_cache[fuse_key] = patch_sets
+                while len(_fused_cache) > max(PATCHED_CACHE_SIZE, 1):
+                    _fused_cache.popitem(last=False)
+
+        current_model, current_clip = apply_patch_sets(model, clip, patch_sets)
+        print(f"[SEngine] Applied {len(resolved)} LoRA(s) as {len(patch_sets)} fused patch set(s)")
+        return current_model, current_clip, all_applied
 
 
 NODE_CLASS_MAPPINGS = {
@@ -0,0 +1,278 @@
+"""
+Downscaled preview thumbnails for the sidebar, cached on disk.
+"""
+import io
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import tempfile
+from typing import Optional, Dict, List, Tuple
+
+import aiohttp
+import blurhash
+import numpy as np
+from PIL import Image, features
+
+from .cache_io import atomic_write_json, FileLock
+from .lora_cache import USER_AGENT
+
+# Shorter side of a thumbnail in pixels (grid tiles are square and cropped client-side)
+THUMB_SIZE = int(os.environ.get("SENGINE_THUMB_SIZE", "320"))
+THUMB_QUALITY = 80
+
+# Previews fetched at once while warming the cache after a catalog refresh
+WARM_CONCURRENCY = 4
+
+# Civitai's image CDN resizes on request, so large originals are never downloaded
+_CIVITAI_TRANSFORM = re.compile(r"/(original=true|width=\d+)(,[^/]*)?/")
+SOURCE_WIDTH = 450
+
+# Blurhash placeholder detail (tiles are square) and the image size it is computed from
+BLURHASH_COMPONENTS = 4
+BLURHASH_SOURCE_SIZE = 32
+
+FETCH_TIMEOUT = 30
+# After a failed fetch (timeout, HTTP error, reset) the original preview is served instead
+# for this long, doubling per further failure up to the maximum
+RETRY_DELAY = 60
+MAX_RETRY_DELAY = 3600
+# A week for URLs carrying the preview's url_version, which change with the preview;
+# a thumbnail requested without it (or with an outdated one) is revalidated every time
+CACHE_CONTROL = "public, max-age=604800"
+CACHE_CONTROL_UNVERSIONED = "no-cache"
+
+
+class _UndecodablePreview(Exception):
+    """Pillow cannot read the preview (e.g. a video); fetching it again will not help."""
+
+
+def url_version(preview_url: str) -> str:
+    """
+    Short hash of a preview URL for the thumbnail URL's v param.
+
+    32-bit FNV-1a over the UTF-8 bytes, so the sidebar computes the same
+    value without a round trip (see thumbUrl in sengine.js).
+    """
+    h = 0x811c9dc5
+    for byte in preview_url.encode('utf-8'):
+        h = ((h ^ byte) * 0x01000193) & 0xffffffff
+    return f"{h:08x}"
+
+
+class ThumbnailCache:
+    """
+    Fetches each LoRA preview once and keeps a small WebP (JPEG where
+    Pillow lacks WebP) under cache/thumbs.
+
+    Files are named after the version and a hash of the preview URL, so a
+    preview that changes on Civitai is fetched again. Previews Pillow cannot
+    decode (e.g. videos) are remembered and not retried until restart;
+    previews that failed to download are retried after a growing delay.
+
+    A blurhash of each thumbnail is computed alongside it and kept in
+    blurhash.json, from where get_blurhash serves it to the catalog.
+    """
+
+    def __init__(self, cache_dir: str = None):
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(__file__), "cache", "thumbs")
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.format, self.extension = ("WEBP", ".webp") if features.check("webp") else ("JPEG", ".jpg")
+        self.content_type = "image/webp" if self.format == "WEBP" else "image/jpeg"
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._failed = set()
+        self._retry: Dict[str, Tuple[float, float]] = {}  # path -> (monotonic retry time, last delay)
+        self._warm_task: Optional[asyncio.Future] = None
+        self._warm_pending: Optional[List[Dict]] = None
+
+        self.blurhash_file = os.path.join(cache_dir, "blurhash.json")
+        self._blurhashes: Dict[str, str] = self._load_blurhashes()
+        self._blurhashes_dirty = False
+
+    def _load_blurhashes(self) -> Dict[str, str]:
+        if os.path.exists(self.blurhash_file):
+            try:
+                with open(self.blurhash_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"[SEngine] Error loading blurhashes: {e}")
+        return {}
+
+    def _save_blurhashes(self):
+        """Merge new blurhashes into blurhash.json (other processes may write it too)."""
+        try:
+            with FileLock(self.blurhash_file + ".lock"):
+                merged = {**self._load_blurhashes(), **self._blurhashes}
+                atomic_write_json(self.blurhash_file, merged, indent=None)
+            self._blurhashes = merged
+            self._blurhashes_dirty = False
+        except Exception as e:
+            print(f"[SEngine] Error saving blurhashes: {e}")
+
+    def get_blurhash(self, version_id: int, preview_url: str) -> Optional[str]:
+        return self._blurhashes.get(os.path.basename(self.get_path(version_id, preview_url)))
+
+    def get_path(self, version_id: int, preview_url: str) -> str:
+        key = hashlib.sha1(preview_url.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"{version_id}-{key}{self.extension}")
+
+    def has_thumbnail(self, version_id: int, preview_url: str) -> bool:
+        return os.path.exists(self.get_path(version_id, preview_url))
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=FETCH_TIMEOUT),
+                headers={"User-Agent": USER_AGENT},
+            )
+        return self._session
+
+    async def _fetch(self, url: str) -> bytes:
+        session = await self._get_session()
+        sized = _CIVITAI_TRANSFORM.sub(f"/width={SOURCE_WIDTH}/", url, count=1)
+        for candidate in dict.fromkeys((sized, url)):
+            async with session.get(candidate) as response:
+                if response.status == 200:
+                    return await response.read()
+        raise IOError(f"HTTP {response.status}")
+
+    @staticmethod
+    def _blurhash(img: Image.Image) -> str:
+        small = img.copy()
+        small.thumbnail((BLURHASH_SOURCE_SIZE, BLURHASH_SOURCE_SIZE))
+        if small.mode != "RGB":
+            small = small.convert("RGB")
+        return blurhash.encode(np.array(small), components_x=BLURHASH_COMPONENTS, components_y=BLURHASH_COMPONENTS)
+
+    def _blurhash_file(self, path: str) -> str:
+        """Blurhash of an existing thumbnail (runs in an executor)."""
+        with Image.open(path) as img:
+            return self._blurhash(img)
+
+    def _write_thumbnail(self, data: bytes, path: str) -> str:
+        """Decode, downscale and atomically store one preview, returning its blurhash (runs in an executor)."""
+        try:
+            with Image.open(io.BytesIO(data)) as src:
+                img = src.convert("RGB")
+        except OSError as e:  # Includes UnidentifiedImageError and truncated images
+            raise _UndecodablePreview(str(e)) from e
+        scale = THUMB_SIZE / min(img.size)
+        if scale < 1:
+            img = img.resize((max(round(img.width * scale), 1), max(round(img.height * scale), 1)),
+                             Image.Resampling.LANCZOS)
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                img.save(f, self.format, quality=THUMB_QUALITY)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return self._blurhash(img)
+
+    async def ensure(self, version_id: int, preview_url: str) -> Optional[str]:
+        """
+        Path of the version's thumbnail, creating it first if needed.
+
+        Returns:
+            The thumbnail path, or None if the preview could not be thumbnailed
+        """
+        path = self.get_path(version_id, preview_url)
+        if os.path.exists(path):
+            return path
+        if path in self._failed:
+            return None
+        retry = self._retry.get(path)
+        if retry is not None and time.monotonic() < retry[0]:
+            return None
+
+        # Panel loads and the warmer ask for the same previews, fetch each once
+        future = self._inflight.get(path)
+        if future is None:
+            future = asyncio.ensure_future(self._create(path, preview_url))
+            self._inflight[path] = future
+            future.add_done_callback(lambda _: self._inflight.pop(path, None))
+        return await asyncio.shield(future)
+
+    async def _create(self, path: str, preview_url: str) -> Optional[str]:
+        try:
+            data = await self._fetch(preview_url)
+            hash_str = await asyncio.get_running_loop().run_in_executor(None, self._write_thumbnail, data, path)
+        except _UndecodablePreview as e:
+            print(f"[SEngine] Cannot thumbnail {preview_url}: {e}")
+            self._failed.add(path)
+            return None
+        except Exception as e:
+            delay = min(self._retry[path][1] * 2, MAX_RETRY_DELAY) if path in self._retry else RETRY_DELAY
+            self._retry[path] = (time.monotonic() + delay, delay)
+            print(f"[SEngine] Could not thumbnail {preview_url}, retrying in {delay}s: {e}")
+            return None
+        self._retry.pop(path, None)
+        self._blurhashes[os.path.basename(path)] = hash_str
+        self._blurhashes_dirty = True
+        return path
+
+    async def _ensure_blurhash(self, version_id: int, preview_url: str):
+        """Thumbnail plus blurhash, hashing thumbnails made before blurhashes were kept."""
+        path = await self.ensure(version_id, preview_url)
+        if path is None or self.get_blurhash(version_id, preview_url):
+            return
+        try:
+            hash_str = await asyncio.get_running_loop().run_in_executor(None, self._blurhash_file, path)
+        except Exception as e:
+            print(f"[SEngine] Could not compute blurhash of {path}: {e}")
+            return
+        self._blurhashes[os.path.basename(path)] = hash_str
+        self._blurhashes_dirty = True
+
+    def warm(self, loras: List[Dict]):
+        """Create missing thumbnails for loras in the background (latest catalog wins)."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Catalog loaded outside the server loop, the next refresh warms
+        self._warm_pending = loras
+        if self._warm_task is None or self._warm_task.done():
+            self._warm_task = asyncio.ensure_future(self._warm())
+
+    async def _warm(self):
+        semaphore = asyncio.Semaphore(WARM_CONCURRENCY)
+
+        async def one(lora):
+            async with semaphore:
+                await self._ensure_blurhash(lora["version_id"], lora["preview_url"])
+
+        while self._warm_pending is not None:
+            loras, self._warm_pending = self._warm_pending, None
+            loras = [lora for lora in loras if lora.get("version_id") and lora.get("preview_url")]
+            missing = [
+                lora for lora in loras
+                if not self.has_thumbnail(lora["version_id"], lora["preview_url"])
+                or not self.get_blurhash(lora["version_id"], lora["preview_url"])
+            ]
+            if missing:
+                print(f"[SEngine] Creating {len(missing)} preview thumbnail(s)")
+                await asyncio.gather(*(one(lora) for lora in missing), return_exceptions=True)
+            if self._blurhashes_dirty:
+                self._save_blurhashes()
+
+
+# Global instance
+_thumbnail_cache: Optional[ThumbnailCache] = None
+
+
+def get_thumbnail_cache() -> ThumbnailCache:
+    """Get or create the global thumbnail cache."""
+    global _thumbnail_cache
+    if _thumbnail_cache is None:
+        _thumbnail_cache = ThumbnailCache()
+    return _thumbnail_cache
@@ -400,6 +400,11 @@ const STYLES = `
     white-space: nowrap;
 }
 .sengine-lora.selected .sengine-lora-name { color: #8c8; }
+.sengine-show-more {
+    display: block;
+    width: 100%;
+    margin-top: 8px;
+}
 .sengine-status {
     padding: 8px 16px;
     font-size: 11px;
@@ -712,27 +717,101 @@ const STYLES = `
 // API
 // ============================================================================
 
+// First page of the unfiltered grid and its ETag, kept in IndexedDB so reloads show it
+// before the server answers and then only revalidate it
+const catalogStore = {
+    db: null,
+    open() {
+        if (!this.db) {
+            this.db = new Promise((resolve, reject) => {
+                const req = indexedDB.open("sengine", 1);
+                req.onupgradeneeded = () => req.result.createObjectStore("catalog");
+                req.onsuccess = () => resolve(req.result);
+                req.onerror = () => reject(req.error);
+            });
+        }
+        return this.db;
+    },
+    async get() {
+        try {
+            const db = await this.open();
+            return await new Promise((resolve, reject) => {
+                const req = db.transaction("catalog").objectStore("catalog").get("first-page");
+                req.onsuccess = () => resolve(req.result || null);
+                req.onerror = () => reject(req.error);
+            });
+        } catch (e) {
+            return null;
+        }
+    },
+    async put(value) {
+        try {
+            const db = await this.open();
+            db.transaction("catalog", "readwrite").objectStore("catalog").put(value, "first-page");
+        } catch (e) {
+            console.warn("[SEngine] Could not store catalog:", e);
+        }
+    }
+};
+
 const sengineAPI = {
-    cache: null,
-    cacheTime: 0,
-    async fetchLoras(apiKey = "", refresh = false) {
-        if (!refresh && this.cache && Date.now() - this.cacheTime < 60000) {
-            return this.cache;
+    pages: new Map(), // Query URL -> {url, etag, data}, revalidated with If-None-Match
+    details: new Map(),
+    async fetchLoraDetail(versionId) {
+        // Description, preview images and trained words are not part of the list
+        if (!this.details.has(versionId)) {
+            this.details.set(versionId, api.fetchApi(`/sengine/lora/${versionId}`)
+                .then(resp => resp.json())
+                .then(data => data.success ? data.lora : null)
+                .catch(e => {
+                    this.details.delete(versionId);
+                    console.error("[SEngine] Detail fetch failed:", e);
+                    return null;
+                }));
         }
+        return this.details.get(versionId);
+    },
+    queryUrl(apiKey, { q = "", tags = [], sort = "", offset = 0, limit = 100, refresh = false } = {}) {
+        const params = new URLSearchParams({ q, offset: String(offset), limit: String(limit) });
+        if (apiKey) params.set("api_key", apiKey);
+        if (sort) params.set("sort", sort);
+        if (refresh) params.set("refresh", "true");
+        tags.forEach(tag => params.append("tag", tag));
+        return `/sengine/loras/query?${params}`;
+    },
+    async queryLoras(apiKey, query = {}) {
         try {
-            const params = new URLSearchParams();
-            if (apiKey) params.set("api_key", apiKey);
-            if (refresh) params.set("refresh", "true");
-            const resp = await api.fetchApi(`/sengine/loras?${params}`);
+            const url = this.queryUrl(apiKey, query);
+            const cached = this.pages.get(url);
+            const headers = cached ? { "If-None-Match": cached.etag } : {};
+            const resp = await api.fetchApi(url, { headers });
+            if (resp.status === 304) {
+                // Our copy of this page is still current
+                return cached.data;
+            }
             const data = await resp.json();
-            if (data.success) {
-                this.cache = data.loras;
-                this.cacheTime = Date.now();
+            if (!data.success) return null;
+            const etag = resp.headers.get("ETag");
+            this.pages.delete(url);
+            if (etag) {
+                this.pages.set(url, { url, etag, data });
+                if (this.pages.size > QUERY_PAGES_KEPT) this.pages.delete(this.pages.keys().next().value);
             }
-            return this.cache || [];
+            return data;
+        } catch (e) {
+            console.error("[SEngine] Query failed:", e);
+            return null;
+        }
+    },
+    async sendPrefetchHints(apiKey, selection, saved) {
+        try {
+            await api.fetchApi("/sengine/prefetch", {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify({ api_key: apiKey, selection, saved })
+            });
         } catch (e) {
-            console.error("[SEngine]", e);
-            return this.cache || [];
+            console.error("[SEngine] Prefetch hints failed:", e);
         }
     }
 };
@@ -741,18 +820,140 @@ const sengineAPI = {
 // Manager
 // ============================================================================
 
+// Search results fetched per page from the server index
+const QUERY_PAGE_SIZE = 100;
+const SEARCH_DEBOUNCE_MS = 250;
+const QUERY_PAGES_KEPT = 50;
+
+// Hash of the preview URL in the thumbnail URL, so the browser fetches a changed preview again
+// (32-bit FNV-1a over UTF-8, must match url_version in thumbnails.py)
+const textEncoder = new TextEncoder();
+function urlVersion(url) {
+    let h = 0x811c9dc5;
+    for (const byte of textEncoder.encode(url)) {
+        h = Math.imul(h ^ byte, 0x01000193) >>> 0;
+    }
+    return h.toString(16).padStart(8, "0");
+}
+
+// Downscaled preview served and cached by the plugin, falls back to Civitai's original on error
+function thumbUrl(lora) {
+    return api.apiURL(`/sengine/thumb/${lora.version_id}?v=${urlVersion(lora.preview_url || "")}`);
+}
+
+// ============================================================================
+// Blurhash placeholders (decoded into a tiny image shown until the thumbnail loads)
+// ============================================================================
+
+const BLURHASH_CHARS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~";
+const BLURHASH_SIZE = 32;
+const blurhashCache = new Map();
+
+function decode83(str) {
+    let value = 0;
+    for (const c of str) value = value * 83 + BLURHASH_CHARS.indexOf(c);
+    return value;
+}
+
+function sRGBToLinear(value) {
+    const v = value / 255;
+    return v <= 0.04045 ? v / 12.92 : Math.pow((v + 0.055) / 1.055, 2.4);
+}
+
+function linearToSRGB(value) {
+    const v = Math.max(0, Math.min(1, value));
+    return Math.round(v <= 0.0031308 ? v * 12.92 * 255 : (1.055 * Math.pow(v, 1 / 2.4) - 0.055) * 255);
+}
+
+function blurhashToDataURL(hash) {
+    if (!hash || hash.length < 6) return "";
+    if (blurhashCache.has(hash)) return blurhashCache.get(hash);
+    try {
+        const sizeFlag = decode83(hash[0]);
+        const numX = (sizeFlag % 9) + 1;
+        const numY = Math.floor(sizeFlag / 9) + 1;
+        const maxValue = (decode83(hash[1]) + 1) / 166;
+        if (hash.length !== 4 + 2 * numX * numY) return "";
+
+        const dc = decode83(hash.slice(2, 6));
+        const colors = [[sRGBToLinear(dc >> 16), sRGBToLinear((dc >> 8) & 255), sRGBToLinear(dc & 255)]];
+        const signPow = v => Math.sign(v) * v * v;
+        for (let i = 1; i < numX * numY; i++) {
+            const ac = decode83(hash.slice(4 + i * 2, 6 + i * 2));
+            colors.push([
+                signPow((Math.floor(ac / 361) - 9) / 9) * maxValue,
+                signPow((Math.floor(ac / 19) % 19 - 9) / 9) * maxValue,
+                signPow((ac % 19 - 9) / 9) * maxValue
+            ]);
+        }
+
+        const canvas = document.createElement("canvas");
+        canvas.width = canvas.height = BLURHASH_SIZE;
+        const ctx = canvas.getContext("2d");
+        const pixels = ctx.createImageData(BLURHASH_SIZE, BLURHASH_SIZE);
+        for (let y = 0; y < BLURHASH_SIZE; y++) {
+            for (let x = 0; x < BLURHASH_SIZE; x++) {
+                let r = 0, g = 0, b = 0;
+                for (let j = 0; j < numY; j++) {
+                    for (let i = 0; i < numX; i++) {
+                        const basis = Math.cos(Math.PI * x * i / BLURHASH_SIZE) * Math.cos(Math.PI * y * j / BLURHASH_SIZE);
+                        const color = colors[i + j * numX];
+                        r += color[0] * basis;
+                        g += color[1] * basis;
+                        b += color[2] * basis;
+                    }
+                }
+                const p = 4 * (x + y * BLURHASH_SIZE);
+                pixels.data[p] = linearToSRGB(r);
+                pixels.data[p + 1] = linearToSRGB(g);
+                pixels.data[p + 2] = linearToSRGB(b);
+                pixels.data[p + 3] = 255;
+            }
+        }
+        ctx.putImageData(pixels, 0, 0);
+        const url = canvas.toDataURL();
+        blurhashCache.set(hash, url);
+        return url;
+    } catch (e) {
+        blurhashCache.set(hash, "");
+        return "";
+    }
+}
+
 class SEngineManager {
     constructor() {
         this.panel = null;
-        this.loras = [];
+        this.grid = null; // Loaded pages of the current query: {key, loras, total, count, tags}
         this.selectedLoras = [];
         this.searchQuery = "";
         this.selectedTags = [];
+        this.queryToken = 0;
+        this.searchTimer = null;
         this.apiKey = localStorage.getItem("sengine_api_key") || "";
         this.sessionCookie = localStorage.getItem("sengine_session_cookie") || "";
+        this.fuseLoras = localStorage.getItem("sengine_fuse_loras") === "true";
         this.targetNode = null;
         this.lastGeneratedImages = []; // Array of {filename, subfolder, type}
         this.savedConfigs = this.loadSavedConfigs();
+        this.prefetchTimer = null;
+    }
+
+    // Tell the server which LoRAs are likely next so it can download them in the background
+    hintPrefetch() {
+        clearTimeout(this.prefetchTimer);
+        this.prefetchTimer = setTimeout(() => {
+            if (!this.apiKey) return;
+            const toHint = (l) => ({
+                version_id: l.version_id,
+                file_name: l.file_name,
+                download_url: l.download_url || "",
+                sha256: l.sha256 || "",
+                file_size_kb: l.file_size_kb || this.grid?.loras.find(c => c.version_id === l.version_id)?.file_size_kb || 0
+            });
+            const selection = this.selectedLoras.map(toHint);
+            const saved = this.savedConfigs.flatMap(c => (c.config?.loras || []).map(toHint));
+            sengineAPI.sendPrefetchHints(this.apiKey, selection, saved);
+        }, 1500);
     }
 
     getOrCreateNode() {
@@ -800,6 +1001,7 @@ class SEngineManager {
 
         const data = {
             api_key: this.apiKey,
+            ...(this.fuseLoras ? { fuse: true } : {}),
             loras: this.selectedLoras.map(l => ({
                 version_id: l.version_id,
                 name: l.name,
@@ -807,6 +1009,7 @@ class SEngineManager {
                 strength_clip: l.strength_clip,
                 file_name: l.file_name,
                 download_url: l.download_url || "",
+                sha256: l.sha256 || "",
                 preview_url: l.preview_url || ""
             }))
         };
@@ -823,6 +1026,7 @@ class SEngineManager {
         }
 
         this.rebuildNodeWidgets();
+        this.hintPrefetch();
     }
 
     rebuildNodeWidgets() {
@@ -922,7 +1126,9 @@ class SEngineManager {
                 strength_clip: 1.0,
                 file_name: lora.file_name,
                 download_url: lora.download_url || "",
-                preview_url: lora.preview_url || ""
+                sha256: lora.sha256 || "",
+                preview_url: lora.preview_url || "",
+                file_size_kb: lora.file_size_kb || 0
             });
         }
 
@@ -972,26 +1178,13 @@ class SEngineManager {
             this.selectedTags.push(tag);
         }
         this.renderTags();
-        this.renderGrid();
+        this.loadGrid();
     }
 
     clearTags() {
         this.selectedTags = [];
         this.renderTags();
-        this.renderGrid();
-    }
-
-    getAllTags() {
-        const tagCounts = {};
-        this.loras.forEach(lora => {
-            (lora.tags || []).forEach(tag => {
-                tagCounts[tag] = (tagCounts[tag] || 0) + 1;
-            });
-        });
-        // Sort by count descending
-        return Object.entries(tagCounts)
-            .sort((a, b) => b[1] - a[1])
-            .map(([tag, count]) => ({ tag, count }));
+        this.loadGrid();
     }
 
     // ========== UI ==========
@@ -1077,6 +1270,14 @@ class SEngineManager {
                         <input type="password" class="sengine-input sengine-session-cookie" placeholder="__Secure-civitai-token value...">
                         <div class="sengine-help-text">Required for uploading images to Civitai. Go to LoRAs tab to upload.</div>
                     </div>
+                    <div class="sengine-settings-group">
+                        <label class="sengine-label">Performance</label>
+                        <label class="sengine-help-text" style="display:flex;align-items:center;gap:6px;cursor:pointer;">
+                            <input type="checkbox" class="sengine-fuse-loras">
+                            Fuse selected LoRAs into a single patch
+                        </label>
+                        <div class="sengine-help-text">Faster sampling with large stacks; results are numerically equivalent</div>
+                    </div>
                     <div class="sengine-settings-group">
                         <label class="sengine-label">Memory Management</label>
                         <button class="sengine-btn sengine-clear-memory" style="width:100%;">
@@ -1097,9 +1298,19 @@ class SEngineManager {
             if (this.targetNode) this.saveToNode();
         };
 
+        const fuseInput = panel.querySelector(".sengine-fuse-loras");
+        fuseInput.checked = this.fuseLoras;
+        fuseInput.onchange = (e) => {
+            this.fuseLoras = e.target.checked;
+            localStorage.setItem("sengine_fuse_loras", String(this.fuseLoras));
+            if (this.targetNode) this.saveToNode();
+        };
+
         panel.querySelector(".sengine-search").oninput = (e) => {
             this.searchQuery = e.target.value;
-            this.renderGrid();
+            // Query once typing pauses rather than on every keystroke
+            clearTimeout(this.searchTimer);
+            this.searchTimer = setTimeout(() => this.loadGrid(), SEARCH_DEBOUNCE_MS);
         };
 
         panel.querySelector(".sengine-refresh").onclick = () => this.loadLoras(true);
@@ -1181,10 +1392,57 @@ class SEngineManager {
         }
     }
 
-    async loadLoras(refresh = false) {
+    async loadLoras(refresh = false, quiet = false) {
+        if (!this.grid && !this.searchQuery && !this.selectedTags.length) {
+            // Show the first page from the last session while the server is asked
+            const stored = await catalogStore.get();
+            if (stored?.data && !this.grid) {
+                sengineAPI.pages.set(stored.url, stored);
+                const { loras, total, count, tags } = stored.data;
+                this.grid = { key: this.gridKey(), loras, total, count, tags };
+                this.renderTags();
+                this.renderGrid();
+                quiet = true;
+            }
+        }
+        await this.loadGrid({ refresh, quiet });
+        sengineAPI.details.clear();
+    }
+
+    gridKey() {
+        return JSON.stringify({ q: this.searchQuery, tags: this.selectedTags });
+    }
+
+    // Fetch the first page of the current search, or the next page with more
+    async loadGrid({ more = false, refresh = false, quiet = true } = {}) {
+        clearTimeout(this.searchTimer);
+        const key = this.gridKey();
+        const same = this.grid?.key === key;
+        const offset = more && same ? this.grid.loras.length : 0;
+        // Reloading the same query keeps the pages already shown
+        const limit = !more && same ? Math.max(this.grid.loras.length, QUERY_PAGE_SIZE) : QUERY_PAGE_SIZE;
+        const token = ++this.queryToken;
+
         const browser = this.panel?.querySelector(".sengine-browser");
-        if (browser) browser.innerHTML = '<div class="sengine-loading">Loading LoRAs...</div>';
-        this.loras = await sengineAPI.fetchLoras(this.apiKey, refresh);
+        if (browser && !quiet) browser.innerHTML = '<div class="sengine-loading">Loading LoRAs...</div>';
+
+        const query = { q: this.searchQuery, tags: this.selectedTags, offset, limit, refresh };
+        const result = await sengineAPI.queryLoras(this.apiKey, query);
+        // A newer keystroke or filter already started another query
+        if (token !== this.queryToken) return;
+        if (!result) {
+            this.renderGrid();
+            return;
+        }
+
+        const page = { loras: result.loras, total: result.total, count: result.count, tags: result.tags };
+        if (offset) {
+            this.grid = { ...page, key, loras: this.grid.loras.concat(result.loras) };
+        } else {
+            this.grid = { ...page, key };
+            const stored = sengineAPI.pages.get(sengineAPI.queryUrl(this.apiKey, query));
+            if (stored && !refresh && !this.searchQuery && !this.selectedTags.length) catalogStore.put(stored);
+        }
         this.renderTags();
         this.renderGrid();
     }
@@ -1198,7 +1456,11 @@ class SEngineManager {
 
         if (!dropdown || !filterRow) return;
 
-        const allTags = this.getAllTags();
+        // Tag counts over the current matches, plus selected tags no match carries so they can be unticked
+        const facets = this.grid?.tags || [];
+        const allTags = facets.concat(this.selectedTags
+            .filter(tag => !facets.some(f => f.tag === tag))
+            .map(tag => ({ tag, count: 0 })));
         if (!allTags.length) {
             filterRow.style.display = "none";
             return;
@@ -1282,6 +1544,7 @@ class SEngineManager {
     saveSavedConfigs() {
         try {
             localStorage.setItem("sengine_saved_configs", JSON.stringify(this.savedConfigs));
+            this.hintPrefetch();
         } catch (e) {
             console.error("[SEngine] Error saving configs:", e);
         }
@@ -1303,6 +1566,7 @@ class SEngineManager {
                 strength_clip: l.strength_clip,
                 file_name: l.file_name,
                 download_url: l.download_url || "",
+                sha256: l.sha256 || "",
                 preview_url: l.preview_url || ""
             }))
         };
@@ -1922,39 +2186,37 @@ class SEngineManager {
         this.updateUploadButton();
     }
 
+    async showLoraDetail(el, lora) {
+        if (el.dataset.detailLoaded) return;
+        el.dataset.detailLoaded = "1";
+        const detail = await sengineAPI.fetchLoraDetail(lora.version_id);
+        if (!detail) {
+            delete el.dataset.detailLoaded;
+            return;
+        }
+        const lines = [detail.name];
+        if (detail.version_name) lines.push(`Version: ${detail.version_name}`);
+        if (detail.trained_words?.length) lines.push(`Trigger words: ${detail.trained_words.join(", ")}`);
+        if (detail.tags?.length) lines.push(`Tags: ${detail.tags.join(", ")}`);
+        el.title = lines.join("\n");
+    }
+
+    // Draw the loaded pages; searching, filtering and paging go through loadGrid
     renderGrid() {
         const browser = this.panel?.querySelector(".sengine-browser");
         const status = this.panel?.querySelector(".sengine-status");
         if (!browser) return;
 
-        let list = this.loras;
-
-        // Filter by selected tags (AND logic - must have all selected tags)
-        if (this.selectedTags.length > 0) {
-            list = list.filter(l =>
-                this.selectedTags.every(tag => (l.tags || []).includes(tag))
-            );
-        }
-
-        // Filter by search query
-        if (this.searchQuery) {
-            const q = this.searchQuery.toLowerCase();
-            list = list.filter(l =>
-                l.name.toLowerCase().includes(q) ||
-                (l.trained_words || []).some(w => w.toLowerCase().includes(q)) ||
-                (l.tags || []).some(t => t.toLowerCase().includes(q))
-            );
-        }
-
-        if (!this.loras.length) {
+        if (!this.grid?.count) {
             browser.innerHTML = '<div class="sengine-empty">Click ↻ to load LoRAs</div>';
             if (status) status.textContent = "";
             return;
         }
 
+        const { loras: list, total, count } = this.grid;
         if (!list.length) {
             browser.innerHTML = '<div class="sengine-empty">No matches found</div>';
-            if (status) status.textContent = `0 of ${this.loras.length} LoRAs`;
+            if (status) status.textContent = `0 of ${count} LoRAs`;
             return;
         }
 
@@ -1971,7 +2233,7 @@ class SEngineManager {
 
             if (previewUrl) {
                 el.innerHTML = `
-                    <img class="sengine-lora-img" src="${previewUrl}" alt="" loading="lazy">
+                    <img class="sengine-lora-img" src="${thumbUrl(lora)}" onerror="this.onerror=null;this.src='${previewUrl}'" alt="" loading="lazy">
                     <div class="sengine-lora-info">
                         <div class="sengine-lora-name">${lora.name}</div>
                     </div>
@@ -1989,12 +2251,32 @@ class SEngineManager {
             }
 
             el.onclick = () => this.toggleLora(lora);
+            el.onmouseenter = () => this.showLoraDetail(el, lora);
+
+            // Blurred preview painted right away, covered by the thumbnail once it loads
+            const img = el.querySelector(".sengine-lora-img");
+            const placeholder = blurhashToDataURL(lora.blurhash);
+            if (img && placeholder) {
+                img.style.backgroundImage = `url(${placeholder})`;
+                img.style.backgroundSize = "cover";
+            }
             grid.appendChild(el);
         });
 
         browser.innerHTML = "";
         browser.appendChild(grid);
-        if (status) status.textContent = `${list.length} of ${this.loras.length} LoRAs`;
+
+        if (total > list.length) {
+            const more = document.createElement("button");
+            more.className = "sengine-btn sengine-show-more";
+            more.textContent = `Show more (${total - list.length})`;
+            more.onclick = () => {
+                more.disabled = true;
+                this.loadGrid({ more: true });
+            };
+            browser.appendChild(more);
+        }
+        if (status) status.textContent = `${total} of ${count} LoRAs`;
     }
 
     renderSelected() {
@@ -2023,7 +2305,7 @@ class SEngineManager {
             if (isFailed) el.style.background = "#422";
 
             const thumbHtml = lora.preview_url
-                ? `<img class="sengine-item-thumb" src="${lora.preview_url}" alt="">`
+                ? `<img class="sengine-item-thumb" src="${thumbUrl(lora)}" onerror="this.onerror=null;this.src='${lora.preview_url}'" alt="">`
                 : `<div class="sengine-item-thumb" style="display:flex;align-items:center;justify-content:center;font-weight:bold;color:#666;">${lora.name[0]}</div>`;
 
             let statusHtml = "";
@@ -2122,10 +2404,15 @@ app.registerExtension({
             }
         });
 
+        // The server refreshed an expired catalog in the background, swap it in without a spinner
+        api.addEventListener("sengine_catalog", () => {
+            sengine.loadLoras(false, true);
+        });
+
         const panel = sengine.createPanel();
 
-        // Load LoRAs on startup
-        sengine.loadLoras();
+        // Load LoRAs on startup, then hint saved configurations for prefetch
+        sengine.loadLoras().then(() => sengine.hintPrefetch());
 
         if (app.extensionManager?.registerSidebarTab) {
             app.extensionManager.registerSidebarTab({